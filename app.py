@@ -1,47 +1,156 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, abort
+from flask import Flask, Blueprint, current_app, render_template, request, jsonify, redirect, url_for, flash, abort
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from flask_mail import Mail, Message
+from flask_wtf.csrf import CSRFProtect
 from datetime import datetime, date
 from functools import wraps
+import hmac
 import os
 from dotenv import load_dotenv
 
 from models import db, User, Room, Booking, Contact
-from forms import ContactForm, BookingForm, LoginForm, RegisterForm
+from db_routing import init_db_routing, init_session_hooks, read_only
+from search import create_search_index, search_records
+from batch import apply_batch, BatchError
+from rollups import build_report, ROLLUP_HOOKS
+from changes import init_change_feed, committed_head, format_cursor, parse_cursor, wait_for_changes, CHANGE_LOG_HOOKS, MAX_PAGE_SIZE
+from live import init_live, dashboard_stats
+from tenancy import init_tenancy, create_property, current_property_id, upgrade_schema, partition_bookings, SCOPING_HOOKS
+from serializers import json_response, RoomSchema, BookingSchema, ContactSchema
+from forms import LoginForm, RegisterForm
+from validation import contact_validator, booking_validator
+from warmup import init_warmup, start_warm_up
+from notifications import send_contact_notification, send_booking_confirmation
+
+
+def normalize_database_url(url):
+    """Railway uses postgres:// but SQLAlchemy needs postgresql://"""
+    if url.startswith('postgres://'):
+        url = url.replace('postgres://', 'postgresql://', 1)
+    return url
+
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
-
-# Configuration
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
-
-# Database configuration - Railway provides DATABASE_URL for PostgreSQL
-database_url = os.getenv('DATABASE_URL', 'sqlite:///gangcheng.db')
-# Railway uses postgres:// but SQLAlchemy needs postgresql://
-if database_url.startswith('postgres://'):
-    database_url = database_url.replace('postgres://', 'postgresql://', 1)
-app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Mail configuration
-app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
-app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 587))
-app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', 'True') == 'True'
-app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
-app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
-app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER', 'noreply@gangcheng.com')
-
-# Initialize extensions
-db.init_app(app)
-mail = Mail(app)
-login_manager = LoginManager(app)
-login_manager.login_view = 'login'
+# Extensions are bound to the app in create_app()
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
 
 # Initialize WTForms CSRF protection
-from flask_wtf.csrf import CSRFProtect
-csrf = CSRFProtect(app)
+csrf = CSRFProtect()
+
+main = Blueprint('main', __name__)
+
+
+def create_app(config=None):
+    """Application factory"""
+    app = Flask(__name__)
+    
+    # Configuration
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
+    
+    # Database configuration - Railway provides DATABASE_URL for PostgreSQL
+    app.config['SQLALCHEMY_DATABASE_URI'] = normalize_database_url(os.getenv('DATABASE_URL', 'sqlite:///gangcheng.db'))
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    
+    # Optional read replica - read-only routes use it while it is healthy
+    replica_url = os.getenv('DATABASE_REPLICA_URL')
+    if replica_url:
+        app.config['SQLALCHEMY_BINDS'] = {'replica': normalize_database_url(replica_url)}
+    app.config['DATABASE_REPLICA_MAX_LAG'] = float(os.getenv('DATABASE_REPLICA_MAX_LAG', 5))
+    app.config['DATABASE_REPLICA_CHECK_INTERVAL'] = float(os.getenv('DATABASE_REPLICA_CHECK_INTERVAL', 5))
+    app.config['DATABASE_REPLICA_STICKY_SECONDS'] = int(os.getenv('DATABASE_REPLICA_STICKY_SECONDS', 10))
+    
+    # Properties: how long each worker caches the list, and PostgreSQL partitioning of bookings
+    app.config['PROPERTY_CACHE_SECONDS'] = float(os.getenv('PROPERTY_CACHE_SECONDS', 30))
+    app.config['PARTITION_BOOKINGS'] = os.getenv('PARTITION_BOOKINGS', 'False') == 'True'
+    
+    # Change feed: bearer token for integrations (admins can always read it), long-poll limit and
+    # long-polls waiting at once per worker (each holds a request thread)
+    app.config['CHANGE_FEED_TOKEN'] = os.getenv('CHANGE_FEED_TOKEN')
+    app.config['CHANGE_FEED_MAX_WAIT'] = float(os.getenv('CHANGE_FEED_MAX_WAIT', 30))
+    app.config['CHANGE_FEED_MAX_WAITERS'] = int(os.getenv('CHANGE_FEED_MAX_WAITERS', 2))
+    
+    # Live admin dashboard: events queued per client, heartbeat and log polling intervals (seconds),
+    # and open streams per worker (each holds a request thread)
+    app.config['ADMIN_EVENTS_BUFFER'] = int(os.getenv('ADMIN_EVENTS_BUFFER', 100))
+    app.config['ADMIN_EVENTS_MAX_STREAMS'] = int(os.getenv('ADMIN_EVENTS_MAX_STREAMS', 3))
+    app.config['ADMIN_EVENTS_HEARTBEAT'] = float(os.getenv('ADMIN_EVENTS_HEARTBEAT', 15))
+    app.config['ADMIN_EVENTS_POLL_SECONDS'] = float(os.getenv('ADMIN_EVENTS_POLL_SECONDS', 1))
+    
+    # Mail configuration
+    app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
+    app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 587))
+    app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', 'True') == 'True'
+    app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
+    app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
+    app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER', 'noreply@gangcheng.com')
+    
+    # Warm-up: connections opened per worker and pages requested before serving
+    app.config['WARMUP_POOL_CONNECTIONS'] = int(os.getenv('WARMUP_POOL_CONNECTIONS', 2))
+    app.config['WARMUP_PATHS'] = os.getenv('WARMUP_PATHS', '/,/rooms,/api/rooms').split(',')
+    # Longest a request waits for its worker's warm-up before it is served anyway
+    app.config['WARMUP_WAIT_SECONDS'] = float(os.getenv('WARMUP_WAIT_SECONDS', 30))
+    
+    if config:
+        app.config.update(config)
+    
+    # Initialize extensions (Flask-Mail is set up lazily by notifications.get_mail)
+    db.init_app(app)
+    init_db_routing(app)
+    init_session_hooks(SCOPING_HOOKS, ROLLUP_HOOKS, CHANGE_LOG_HOOKS)
+    login_manager.init_app(app)
+    csrf.init_app(app)
+    init_warmup(app)
+    init_live(app)
+    init_change_feed(app)
+    
+    app.register_blueprint(main)
+    # After the blueprint, so create_tables() has run before a property is selected
+    init_tenancy(app)
+    return app
+
+
+# Shown by /api/rooms until rooms have been added to the database
+DEFAULT_ROOMS = [
+    {
+        'id': 1,
+        'name': 'Mountain View Suite',
+        'type': 'Double',
+        'description': 'Panoramic views of the Central Mountain Range with private balcony.',
+        'amenities': ['wifi', 'ac_unit', 'bathtub'],
+        'price_per_night': 3500,
+        'max_guests': 2,
+        'is_featured': True,
+        'is_available': True,
+        'image': 'https://lh3.googleusercontent.com/aida-public/AB6AXuAfSeuNAoDegBpufzWqzdrSSVT14xZxtfoHxcfSyc69724GJU9OoSIUQ9XtIdldIX6lt-3YYJnOEp2c-UWwoCtef72BPrWe9CoG54q8ytDqo194-mkyJhSaYvelJcHxAi0JfV7VblOgi0Ed7iSUs6kjNHJ8eUiDpwjQaTvwWEKdQJxHiVcY1uMXVAtLADX9Obg2YUvP16PD5qEF_0dU3dAREY5gZFoR_b5EKozOotoV4BnsLAlCZy5VFWhp8FBIWKn7wKZ3YJMzZZs'
+    },
+    {
+        'id': 2,
+        'name': 'Garden Room',
+        'type': 'Queen',
+        'description': 'Direct access to our lush private gardens, perfect for morning meditation.',
+        'amenities': ['wifi', 'ac_unit', 'yard'],
+        'price_per_night': 3000,
+        'max_guests': 2,
+        'is_featured': True,
+        'is_available': True,
+        'image': 'https://lh3.googleusercontent.com/aida-public/AB6AXuD3U8bU2YjeeHA7KtMjl87sGK3BQo3c4yxM1vmVBsjlk0E5hd1kaF_kUv3tZCMdjl19a1dHO9kjtyKwSVFfxjl7gQbbuuPLIhsyAvtx-frxaULsbn99DaMIdF3NfNNdZS7sbp5Mck6yZ2ov12BJNAxUmeSqNrBvmwWG2SBszwhMlvXq_cW6QA5lnuBhENmkm3EQw51eS0XalhXND33EldbotLjBmpPtCVjub5F12fAWtU8FJlGq1Vh-n9TqS2LD1DF68WqvddGCdHQ'
+    },
+    {
+        'id': 3,
+        'name': 'Family Villa',
+        'type': 'Family',
+        'description': 'Spacious accommodation for the whole family with separate living area.',
+        'amenities': ['wifi', 'kitchen', 'tv'],
+        'price_per_night': 5000,
+        'max_guests': 5,
+        'is_featured': False,
+        'is_available': True,
+        'image': 'https://lh3.googleusercontent.com/aida-public/AB6AXuAc5I5gOEfXLGf85VNLedCV4wKwVtoL-tk7VCdHA4AcLKmHwT49rWefxSZvPhvAoObl2kBvADc_uXUD-FUsROyUmPviYgDmVbWfzV3NJ1ccsmf9sBHI5LF6VG6pcS6wkSSMnWyhmRn4_80IUyto-pBoQdwE7xXrkT6vPJ8bt1XSkXrV5InMpRT0Z0Ler-heyhUhHTgKk3zBI0-lSuedBU6Bl7G3gLuajY7xtavskWjFhPoWsMRDUtAMXsWxgbKtuVAlUOflDgCAYWI'
+    }
+]
+
 
 # Disable CSRF for API endpoints
 @csrf.exempt
@@ -66,70 +175,74 @@ def admin_required(f):
     return decorated_function
 
 
-@app.route('/')
+def integration_required(f):
+    """Decorator to require the integration token (Authorization: Bearer) or admin access"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        token = current_app.config.get('CHANGE_FEED_TOKEN')
+        supplied = request.headers.get('Authorization', '')
+        if token and hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode()):
+            return f(*args, **kwargs)
+        if not current_user.is_authenticated or not current_user.is_admin:
+            abort(403)  # Forbidden
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+@main.route('/')
+@read_only
 def index():
     """Homepage with featured room listings"""
     rooms = Room.query.filter_by(is_available=True, is_featured=True).all()
     return render_template('index.html', rooms=rooms)
 
 
-@app.route('/rooms')
+@main.route('/rooms')
+@read_only
 def all_rooms():
     """All rooms page"""
     rooms = Room.query.all()
     return render_template('rooms.html', rooms=rooms)
 
 
-@app.route('/about')
+@main.route('/about')
 def about():
     """About/Story page"""
     return render_template('about.html')
 
 
-@app.route('/contact')
+@main.route('/contact')
 def contact_page():
     """Contact page"""
     return render_template('contact.html')
 
 
-@app.route('/api/contact', methods=['POST'])
+@main.route('/api/contact', methods=['POST'])
 @csrf.exempt
 def contact():
     """Handle contact form submissions"""
-    form = ContactForm(data=request.get_json(), meta={'csrf': False})
+    data, errors = contact_validator.validate(request.get_json())
     
-    if form.validate():
+    if not errors:
         # Save to database
         contact_msg = Contact(
-            name=form.name.data,
-            email=form.email.data,
-            phone=form.phone.data,
-            subject=form.subject.data,
-            message=form.message.data
+            name=data['name'],
+            email=data['email'],
+            phone=data['phone'],
+            subject=data['subject'],
+            message=data['message']
         )
         db.session.add(contact_msg)
         db.session.commit()
         
         # Send email notification
-        try:
-            msg = Message(
-                subject=f"Contact Form: {form.subject.data or 'New Message'}",
-                recipients=[app.config['MAIL_DEFAULT_SENDER']],
-                reply_to=form.email.data
-            )
-            msg.body = f"""
-New contact form submission:
-
-Name: {form.name.data}
-Email: {form.email.data}
-Phone: {form.phone.data or 'Not provided'}
-
-Message:
-{form.message.data}
-            """
-            mail.send(msg)
-        except Exception as e:
-            print(f"Email sending failed: {e}")
+        send_contact_notification(
+            name=data['name'],
+            email=data['email'],
+            phone=data['phone'],
+            subject=data['subject'],
+            message=data['message']
+        )
         
         return jsonify({
             'success': True,
@@ -138,19 +251,19 @@ Message:
     
     return jsonify({
         'success': False,
-        'errors': form.errors
+        'errors': errors
     }), 400
 
 
-@app.route('/api/booking', methods=['POST'])
+@main.route('/api/booking', methods=['POST'])
 @csrf.exempt
 def booking():
     """Handle booking requests"""
-    form = BookingForm(data=request.get_json(), meta={'csrf': False})
+    data, errors = booking_validator.validate(request.get_json())
     
-    if form.validate():
+    if not errors:
         # Get room and check availability
-        room = Room.query.get(form.room_id.data)
+        room = Room.query.get(data['room_id'])
         if not room or not room.is_available:
             return jsonify({
                 'success': False,
@@ -158,7 +271,7 @@ def booking():
             }), 400
         
         # Calculate total price
-        days = (form.check_out.data - form.check_in.data).days
+        days = (data['check_out'] - data['check_in']).days
         total_price = days * room.price_per_night
         
         # Create booking (requires authentication)
@@ -166,46 +279,30 @@ def booking():
         
         new_booking = Booking(
             user_id=user_id,
-            room_id=form.room_id.data,
-            guest_name=form.guest_name.data,
-            guest_email=form.guest_email.data,
-            guest_phone=form.guest_phone.data,
-            check_in=form.check_in.data,
-            check_out=form.check_out.data,
-            num_guests=form.num_guests.data,
+            room_id=data['room_id'],
+            guest_name=data['guest_name'],
+            guest_email=data['guest_email'],
+            guest_phone=data['guest_phone'],
+            check_in=data['check_in'],
+            check_out=data['check_out'],
+            num_guests=data['num_guests'],
             total_price=total_price,
-            special_requests=form.special_requests.data
+            special_requests=data['special_requests']
         )
         
         db.session.add(new_booking)
         db.session.commit()
         
         # Send confirmation email
-        try:
-            msg = Message(
-                subject=f"Booking Confirmation - {room.name}",
-                recipients=[form.guest_email.data]
-            )
-            msg.body = f"""
-Dear {form.guest_name.data},
-
-Thank you for your booking request at Gancheng B&B!
-
-Booking Details:
-- Room: {room.name}
-- Check-in: {form.check_in.data.strftime('%B %d, %Y')}
-- Check-out: {form.check_out.data.strftime('%B %d, %Y')}
-- Guests: {form.num_guests.data}
-- Total: NT$ {total_price:,.0f}
-
-Your booking is currently pending confirmation. We will contact you shortly to confirm availability.
-
-Best regards,
-Gancheng B&B Team
-            """
-            mail.send(msg)
-        except Exception as e:
-            print(f"Email sending failed: {e}")
+        send_booking_confirmation(
+            guest_name=data['guest_name'],
+            guest_email=data['guest_email'],
+            room_name=room.name,
+            check_in=data['check_in'],
+            check_out=data['check_out'],
+            num_guests=data['num_guests'],
+            total_price=total_price
+        )
         
         return jsonify({
             'success': True,
@@ -215,64 +312,56 @@ Gancheng B&B Team
     
     return jsonify({
         'success': False,
-        'errors': form.errors
+        'errors': errors
     }), 400
 
 
-@app.route('/api/rooms')
+@main.route('/api/rooms')
+@read_only
 def get_rooms():
     """API endpoint for room data"""
-    rooms = Room.query.filter_by(is_available=True).all()
+    try:
+        schema = RoomSchema.from_request(request.args)
+    except ValueError as e:
+        return json_response({'success': False, 'error': str(e)}, 400)
+    
+    rows = db.session.execute(schema.select().where(Room.is_available.is_(True))).all()
     
     # If database is empty, return default data
-    if not rooms:
-        return jsonify([
-            {
-                'id': 1,
-                'name': 'Mountain View Suite',
-                'type': 'Double',
-                'description': 'Panoramic views of the Central Mountain Range with private balcony.',
-                'amenities': ['wifi', 'ac_unit', 'bathtub'],
-                'price_per_night': 3500,
-                'image': 'https://lh3.googleusercontent.com/aida-public/AB6AXuAfSeuNAoDegBpufzWqzdrSSVT14xZxtfoHxcfSyc69724GJU9OoSIUQ9XtIdldIX6lt-3YYJnOEp2c-UWwoCtef72BPrWe9CoG54q8ytDqo194-mkyJhSaYvelJcHxAi0JfV7VblOgi0Ed7iSUs6kjNHJ8eUiDpwjQaTvwWEKdQJxHiVcY1uMXVAtLADX9Obg2YUvP16PD5qEF_0dU3dAREY5gZFoR_b5EKozOotoV4BnsLAlCZy5VFWhp8FBIWKn7wKZ3YJMzZZs'
-            },
-            {
-                'id': 2,
-                'name': 'Garden Room',
-                'type': 'Queen',
-                'description': 'Direct access to our lush private gardens, perfect for morning meditation.',
-                'amenities': ['wifi', 'ac_unit', 'yard'],
-                'price_per_night': 3000,
-                'image': 'https://lh3.googleusercontent.com/aida-public/AB6AXuD3U8bU2YjeeHA7KtMjl87sGK3BQo3c4yxM1vmVBsjlk0E5hd1kaF_kUv3tZCMdjl19a1dHO9kjtyKwSVFfxjl7gQbbuuPLIhsyAvtx-frxaULsbn99DaMIdF3NfNNdZS7sbp5Mck6yZ2ov12BJNAxUmeSqNrBvmwWG2SBszwhMlvXq_cW6QA5lnuBhENmkm3EQw51eS0XalhXND33EldbotLjBmpPtCVjub5F12fAWtU8FJlGq1Vh-n9TqS2LD1DF68WqvddGCdHQ'
-            },
-            {
-                'id': 3,
-                'name': 'Family Villa',
-                'type': 'Family',
-                'description': 'Spacious accommodation for the whole family with separate living area.',
-                'amenities': ['wifi', 'kitchen', 'tv'],
-                'price_per_night': 5000,
-                'image': 'https://lh3.googleusercontent.com/aida-public/AB6AXuAc5I5gOEfXLGf85VNLedCV4wKwVtoL-tk7VCdHA4AcLKmHwT49rWefxSZvPhvAoObl2kBvADc_uXUD-FUsROyUmPviYgDmVbWfzV3NJ1ccsmf9sBHI5LF6VG6pcS6wkSSMnWyhmRn4_80IUyto-pBoQdwE7xXrkT6vPJ8bt1XSkXrV5InMpRT0Z0Ler-heyhUhHTgKk3zBI0-lSuedBU6Bl7G3gLuajY7xtavskWjFhPoWsMRDUtAMXsWxgbKtuVAlUOflDgCAYWI'
-            }
-        ])
-    
-    return jsonify([{
-        'id': room.id,
-        'name': room.name,
-        'type': room.room_type,
-        'description': room.description,
-        'amenities': room.amenities.split(',') if room.amenities else [],
-        'price_per_night': room.price_per_night,
-        'image': room.image_url
-    } for room in rooms])
+    if not rows:
+        return json_response(schema.pick(DEFAULT_ROOMS))
+    
+    return json_response(schema.dump_rows(rows))
+
+
+@main.route('/api/changes')
+@integration_required
+def get_changes():
+    """Room and booking change feed (?since=<cursor>&limit=&wait=<seconds to long-poll>)"""
+    limit = min(max(request.args.get('limit', 100, type=int), 1), MAX_PAGE_SIZE)
+    wait = min(max(request.args.get('wait', 0, type=int), 0), current_app.config['CHANGE_FEED_MAX_WAIT'])
+    waiters = current_app.extensions['change_feed_waiters']
+    if wait and not waiters.acquire(blocking=False):
+        response = json_response({'success': False, 'error': 'Too many long-polls waiting, try again shortly'}, 503)
+        response.headers['Retry-After'] = '5'
+        return response
+    try:
+        feed = wait_for_changes(request.args.get('since'), limit=limit, timeout=wait)
+    except ValueError as e:
+        return json_response({'success': False, 'error': str(e)}, 400)
+    finally:
+        if wait:
+            waiters.release()
+    
+    return json_response(feed)
 
 
 # Authentication Routes
-@app.route('/register', methods=['GET', 'POST'])
+@main.route('/register', methods=['GET', 'POST'])
 def register():
     """User registration"""
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     form = RegisterForm()
     
@@ -310,7 +399,7 @@ def register():
                 return jsonify({'success': True, 'message': 'Registration successful'})
             
             flash('Registration successful! Welcome to Gancheng B&B', 'success')
-            return redirect(url_for('index'))
+            return redirect(url_for('main.index'))
         
         if request.is_json:
             return jsonify({'success': False, 'errors': form.errors}), 400
@@ -318,11 +407,11 @@ def register():
     return render_template('register.html', form=form)
 
 
-@app.route('/login', methods=['GET', 'POST'])
+@main.route('/login', methods=['GET', 'POST'])
 def login():
     """User login"""
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     form = LoginForm()
     
@@ -341,7 +430,7 @@ def login():
                 
                 flash('Welcome back!', 'success')
                 next_page = request.args.get('next')
-                return redirect(next_page) if next_page else redirect(url_for('index'))
+                return redirect(next_page) if next_page else redirect(url_for('main.index'))
             
             if request.is_json:
                 return jsonify({'success': False, 'message': 'Invalid email or password'}), 401
@@ -354,16 +443,17 @@ def login():
     return render_template('login.html', form=form)
 
 
-@app.route('/logout')
+@main.route('/logout')
 @login_required
 def logout():
     """User logout"""
     logout_user()
     flash('You have been logged out', 'info')
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
 
-@app.route('/profile')
+@main.route('/profile')
+@read_only
 @login_required
 def profile():
     """User profile with bookings"""
@@ -371,7 +461,9 @@ def profile():
     return render_template('profile.html', bookings=bookings)
 
 
-@app.route('/admin')
+# Not @read_only: the page's events cursor must come from the same database as its
+# rows, and a replica cursor too far behind makes /admin/events send reset forever
+@main.route('/admin')
 @login_required
 @admin_required
 def admin_dashboard():
@@ -383,22 +475,127 @@ def admin_dashboard():
     users = User.query.order_by(User.created_at.desc()).all()
     
     # Calculate statistics
-    stats = {
-        'total_bookings': Booking.query.count(),
-        'pending_bookings': Booking.query.filter_by(status='pending').count(),
-        'new_contacts': Contact.query.filter_by(status='new').count(),
-        'total_users': User.query.count()
-    }
+    stats = dashboard_stats()
     
     return render_template('admin.html', 
                          bookings=bookings, 
                          contacts=contacts, 
                          rooms=rooms, 
                          users=users,
-                         stats=stats)
+                         stats=stats,
+                         room_schema=RoomSchema(only=list(RoomSchema.fields)),
+                         events_cursor=format_cursor(*committed_head()))
 
 
-@app.route('/room/<int:room_id>')
+@main.route('/admin/events')
+@login_required
+@admin_required
+def admin_events():
+    """Server-sent events with booking, contact and stats changes for the dashboard"""
+    try:
+        # Browsers send Last-Event-ID when they reconnect; the page passes ?since= first
+        position = parse_cursor(request.headers.get('Last-Event-ID') or request.args.get('since'))
+    except ValueError as e:
+        return json_response({'success': False, 'error': str(e)}, 400)
+    response = current_app.extensions['live'].stream(current_property_id(), position)
+    if response is None:
+        response = json_response({'success': False, 'error': 'Too many open dashboards, try again shortly'}, 503)
+        response.headers['Retry-After'] = '5'
+    return response
+
+
+def admin_list_response(schema_class):
+    """Paginated JSON list for an admin model, newest first"""
+    try:
+        schema = schema_class.from_request(request.args)
+    except ValueError as e:
+        return json_response({'success': False, 'error': str(e)}, 400)
+    
+    model = schema_class.model
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 50, type=int), 1), 500)
+    
+    statement = schema.select().order_by(model.created_at.desc(), model.id.desc())
+    if request.args.get('status'):
+        statement = statement.where(model.status == request.args['status'])
+    rows = db.session.execute(statement.limit(per_page).offset((page - 1) * per_page)).all()
+    
+    return json_response({'items': schema.dump_rows(rows), 'page': page, 'per_page': per_page})
+
+
+@main.route('/admin/api/bookings')
+@read_only
+@login_required
+@admin_required
+def admin_bookings_json():
+    """JSON list of bookings (supports ?status=, ?fields=, ?page=)"""
+    return admin_list_response(BookingSchema)
+
+
+@main.route('/admin/api/contacts')
+@read_only
+@login_required
+@admin_required
+def admin_contacts_json():
+    """JSON list of contact messages (supports ?status=, ?fields=, ?page=)"""
+    return admin_list_response(ContactSchema)
+
+
+@main.route('/admin/search')
+@read_only
+@login_required
+@admin_required
+def admin_search():
+    """Full-text search over contact messages and bookings"""
+    query = request.args.get('q', '').strip()
+    types = request.args.get('type')
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    
+    return jsonify(search_records(
+        query,
+        types=types.split(',') if types else None,
+        page=page,
+        per_page=per_page
+    ))
+
+
+@main.route('/admin/reports')
+@read_only
+@login_required
+@admin_required
+def admin_reports():
+    """Revenue, occupancy and booking counts (?from=&to=&group_by=day|month|year|room&room_id=)"""
+    try:
+        report = build_report(
+            start=request.args.get('from'),
+            end=request.args.get('to'),
+            group_by=request.args.get('group_by', 'month'),
+            room_id=request.args.get('room_id', type=int)
+        )
+    except ValueError as e:
+        return json_response({'success': False, 'error': str(e)}, 400)
+    
+    return json_response(report)
+
+
+@main.route('/admin/property', methods=['POST'])
+@csrf.exempt
+@login_required
+@admin_required
+def admin_create_property():
+    """Add a property (slug, name and optional domain)"""
+    data = request.get_json(silent=True) or {}
+    try:
+        prop = create_property(data.get('slug'), data.get('name'), data.get('domain'))
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, 'property_id': prop.id, 'slug': prop.slug})
+
+
+@main.route('/room/<int:room_id>')
+@read_only
 def room_detail(room_id):
     """Room detail page"""
     room = Room.query.get_or_404(room_id)
@@ -407,7 +604,7 @@ def room_detail(room_id):
 
 
 # Admin CRUD Routes
-@app.route('/admin/booking/<int:booking_id>/status', methods=['POST'])
+@main.route('/admin/booking/<int:booking_id>/status', methods=['POST'])
 @csrf.exempt
 @login_required
 @admin_required
@@ -420,7 +617,7 @@ def update_booking_status(booking_id):
     return jsonify({'success': True, 'status': booking.status})
 
 
-@app.route('/admin/booking/<int:booking_id>', methods=['DELETE'])
+@main.route('/admin/booking/<int:booking_id>', methods=['DELETE'])
 @csrf.exempt
 @login_required
 @admin_required
@@ -432,7 +629,7 @@ def delete_booking(booking_id):
     return jsonify({'success': True})
 
 
-@app.route('/admin/room', methods=['POST'])
+@main.route('/admin/room', methods=['POST'])
 @csrf.exempt
 @login_required
 @admin_required
@@ -459,7 +656,7 @@ def create_room():
         return jsonify({'success': False, 'error': str(e)}), 400
 
 
-@app.route('/admin/room/<int:room_id>', methods=['PUT'])
+@main.route('/admin/room/<int:room_id>', methods=['PUT'])
 @csrf.exempt
 @login_required
 @admin_required
@@ -486,7 +683,7 @@ def update_room(room_id):
         return jsonify({'success': False, 'error': str(e)}), 400
 
 
-@app.route('/admin/room/<int:room_id>', methods=['DELETE'])
+@main.route('/admin/room/<int:room_id>', methods=['DELETE'])
 @csrf.exempt
 @login_required
 @admin_required
@@ -498,7 +695,7 @@ def delete_room(room_id):
     return jsonify({'success': True})
 
 
-@app.route('/admin/contact/<int:contact_id>/status', methods=['POST'])
+@main.route('/admin/contact/<int:contact_id>/status', methods=['POST'])
 @csrf.exempt
 @login_required
 @admin_required
@@ -511,7 +708,7 @@ def update_contact_status(contact_id):
     return jsonify({'success': True, 'status': contact.status})
 
 
-@app.route('/admin/contact/<int:contact_id>', methods=['DELETE'])
+@main.route('/admin/contact/<int:contact_id>', methods=['DELETE'])
 @csrf.exempt
 @login_required
 @admin_required
@@ -523,19 +720,43 @@ def delete_contact(contact_id):
     return jsonify({'success': True})
 
 
+@main.route('/admin/batch', methods=['POST'])
+@csrf.exempt
+@login_required
+@admin_required
+def admin_batch():
+    """Apply several booking/contact/room operations in one transaction"""
+    data = request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, dict) else None
+    
+    try:
+        results = apply_batch(operations)
+    except BatchError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    success = all(not result.get('error') and not result['failed'] for result in results)
+    return jsonify({'success': success, 'results': results}), 200 if success else 207
+
+
 # Database initialization
-@app.before_request
+@main.before_app_request
 def create_tables():
     """Create database tables before first request"""
-    db.create_all()
+    db.create_all(bind_key=None)
 
 
-@app.route('/init-db')
+@main.route('/init-db')
 def init_database():
     """Initialize database - call this once after deployment"""
     try:
-        # Create all tables
-        db.create_all()
+        # Create all tables (and add property columns to older databases)
+        upgrade_schema()
+        create_search_index()
+        if current_app.config['PARTITION_BOOKINGS']:
+            partition_bookings()
         
         # Check if already initialized
         if User.query.count() > 0:
@@ -605,9 +826,20 @@ def init_database():
         return jsonify({'error': str(e)}), 500
 
 
+@main.route('/ready')
+def ready():
+    """Readiness probe - 200 once this worker has finished warming up"""
+    state = current_app.extensions['warmup']
+    return jsonify(state), 200 if state['ready'] else 503
+
+
+app = create_app()
+
+
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        db.create_all(bind_key=None)
+    start_warm_up(app)
     # Use Railway's PORT environment variable or default to 5000
     port = int(os.getenv('PORT', 5000))
     app.run(debug=False, host='0.0.0.0', port=port)
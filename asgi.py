@@ -0,0 +1,358 @@
+"""ASGI entry point for the public JSON API
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8001
+
+Serves ``GET /api/rooms``, ``POST /api/booking`` and ``POST /api/contact``
+with async handlers on an async SQLAlchemy engine (aiosqlite for SQLite,
+asyncpg for PostgreSQL). Models, validation rules, serializers and email
+templates are shared with the Flask app, so this can be deployed next to
+``gunicorn app:app`` against the same database with ``/api/*`` routed here.
+
+Each request is scoped to the property picked by ``?property=<slug>``, the
+one remembered in the Flask session cookie or the Host header, as in the
+Flask app (see tenancy.py).
+
+Bookings and contact messages send back the Flask session cookie with
+``db_primary_until`` set, so the client's next Flask pages read the primary
+and see the write, as after a write in the Flask app (see db_routing.py).
+
+Requests beyond ``ASGI_MAX_CONCURRENCY`` wait up to ``ASGI_QUEUE_TIMEOUT``
+seconds for a slot and then get a 503. Confirmation emails are sent from a
+worker thread after the response, so SMTP never holds a request.
+"""
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qsl
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.http import dump_cookie
+
+from app import app as flask_app, DEFAULT_ROOMS
+from db_routing import REPLICA_BIND
+from models import db, Booking, Contact, Room
+from notifications import send_booking_confirmation, send_contact_notification
+from serializers import RoomSchema, dumps
+from tenancy import property_scope
+from validation import booking_validator, contact_validator
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+def async_database_url(url):
+    """Swap the sync driver in a SQLAlchemy URL for its async counterpart"""
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for {backend}")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+class BadRequest(Exception):
+    """Request body could not be read as a JSON object"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class APIApplication:
+    """Minimal ASGI application for the public JSON endpoints"""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.max_concurrency = int(os.getenv('ASGI_MAX_CONCURRENCY', 64))
+        self.queue_timeout = float(os.getenv('ASGI_QUEUE_TIMEOUT', 5))
+        self.pool_size = int(os.getenv('ASGI_DB_POOL_SIZE', 10))
+        self.engine = None
+        self.sessions = None
+        self.slots = None
+        self.background_tasks = set()
+        self.routes = {
+            ('GET', '/api/rooms'): self.get_rooms,
+            ('POST', '/api/booking'): self.booking,
+            ('POST', '/api/contact'): self.contact,
+        }
+
+    # Lifecycle
+
+    async def startup(self):
+        if self.engine is not None:
+            return
+        with self.flask_app.app_context():
+            # Flask-SQLAlchemy has already resolved relative SQLite paths
+            url = async_database_url(db.engine.url)
+        options = {} if url.get_backend_name() == 'sqlite' else {'pool_size': self.pool_size}
+        self.engine = create_async_engine(url, **options)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.slots = asyncio.Semaphore(self.max_concurrency)
+
+    async def shutdown(self):
+        if self.background_tasks:
+            await asyncio.gather(*self.background_tasks, return_exceptions=True)
+        if self.engine is not None:
+            await self.engine.dispose()
+            self.engine = None
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.startup()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    # ASGI entry point
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        await self.startup()
+        handler = self.routes.get((scope['method'], scope['path']))
+        if handler is None:
+            status, data = 404, {'success': False, 'message': 'Not found'}
+        else:
+            status, data = await self.dispatch(handler, scope, receive)
+        headers = self.stick_to_primary(scope) if scope.get('db_wrote') else []
+        await self.respond(send, status, data, headers)
+
+    async def dispatch(self, handler, scope, receive):
+        """Run a handler once a concurrency slot is free"""
+        try:
+            await asyncio.wait_for(self.slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            return 503, {'success': False, 'message': 'Server busy, please retry'}
+
+        try:
+            property_id = await self.select_property(scope)
+            with property_scope(property_id):
+                return await handler(scope, receive)
+        except BadRequest as e:
+            return e.status, {'success': False, 'message': str(e)}
+        except Exception as e:
+            print(f"ASGI API error: {e}")
+            return 500, {'success': False, 'message': 'Internal server error'}
+        finally:
+            self.slots.release()
+
+    async def respond(self, send, status, data, headers=()):
+        body = dumps(data)
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                *headers,
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    # Helpers
+
+    async def read_json(self, receive):
+        """Read the request body as a JSON object"""
+        chunks, size = [], 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                raise BadRequest('Request body too large', status=413)
+            chunks.append(chunk)
+            more_body = message.get('more_body', False)
+
+        try:
+            data = json.loads(b''.join(chunks) or b'null')
+        except ValueError:
+            raise BadRequest('Invalid JSON body')
+        if not isinstance(data, dict):
+            raise BadRequest('Invalid JSON body')
+        return data
+
+    async def select_property(self, scope):
+        """Property id for the request from ?property=, the Flask session or the Host header"""
+        directory = self.flask_app.extensions['tenancy']
+        if not directory.is_fresh():
+            await asyncio.to_thread(self.load_properties)
+        args = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+        host = next((value.decode('latin-1') for name, value in scope['headers'] if name == b'host'), None)
+        prop = directory.choose(slug=args.get('property') or self.read_session(scope).get('property'), host=host)
+        return prop['id'] if prop else None
+
+    def load_properties(self):
+        with self.flask_app.app_context():
+            self.flask_app.extensions['tenancy'].load()
+
+    def read_session(self, scope):
+        """Contents of the Flask session cookie; empty if missing or invalid"""
+        cookie_name = self.flask_app.config['SESSION_COOKIE_NAME']
+        for name, value in scope['headers']:
+            if name != b'cookie':
+                continue
+            cookie = SimpleCookie(value.decode('latin-1')).get(cookie_name)
+            if cookie is None:
+                continue
+            serializer = self.flask_app.session_interface.get_signing_serializer(self.flask_app)
+            try:
+                data = serializer.loads(cookie.value)
+            except Exception:
+                return {}
+            return data if isinstance(data, dict) else {}
+        return {}
+
+    def stick_to_primary(self, scope):
+        """Set-Cookie header keeping the client's Flask reads on the primary for a while"""
+        app = self.flask_app
+        if REPLICA_BIND not in app.config.get('SQLALCHEMY_BINDS', {}):
+            return []
+        data = self.read_session(scope)
+        data['db_primary_until'] = time.time() + app.config.get('DATABASE_REPLICA_STICKY_SECONDS', 10)
+        interface = app.session_interface
+        cookie = dump_cookie(
+            interface.get_cookie_name(app),
+            interface.get_signing_serializer(app).dumps(data),
+            expires=datetime.now(timezone.utc) + app.permanent_session_lifetime if data.get('_permanent') else None,
+            path=interface.get_cookie_path(app),
+            domain=interface.get_cookie_domain(app),
+            secure=interface.get_cookie_secure(app),
+            httponly=interface.get_cookie_httponly(app),
+            samesite=interface.get_cookie_samesite(app)
+        )
+        return [(b'set-cookie', cookie.encode('latin-1'))]
+
+    def session_user_id(self, scope):
+        """Logged-in user id from the Flask session cookie, if any"""
+        user_id = self.read_session(scope).get('_user_id')
+        try:
+            return int(user_id) if user_id else None
+        except (TypeError, ValueError):
+            return None
+
+    def in_background(self, func, **kwargs):
+        """Run a blocking function (SMTP) in a thread inside the Flask app context"""
+        def run():
+            with self.flask_app.app_context():
+                func(**kwargs)
+
+        task = asyncio.ensure_future(asyncio.to_thread(run))
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+
+    # Handlers
+
+    async def get_rooms(self, scope, receive):
+        """API endpoint for room data"""
+        args = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+        try:
+            schema = RoomSchema.from_request(args)
+        except ValueError as e:
+            return 400, {'success': False, 'error': str(e)}
+
+        async with self.sessions() as session:
+            rows = (await session.execute(schema.select().where(Room.is_available.is_(True)))).all()
+
+        # If database is empty, return default data
+        if not rows:
+            return 200, schema.pick(DEFAULT_ROOMS)
+        return 200, schema.dump_rows(rows)
+
+    async def contact(self, scope, receive):
+        """Handle contact form submissions"""
+        data, errors = contact_validator.validate(await self.read_json(receive))
+        if errors:
+            return 400, {'success': False, 'errors': errors}
+
+        async with self.sessions() as session:
+            session.add(Contact(
+                name=data['name'],
+                email=data['email'],
+                phone=data['phone'],
+                subject=data['subject'],
+                message=data['message']
+            ))
+            await session.commit()
+        scope['db_wrote'] = True
+
+        self.in_background(
+            send_contact_notification,
+            name=data['name'],
+            email=data['email'],
+            phone=data['phone'],
+            subject=data['subject'],
+            message=data['message']
+        )
+        return 200, {
+            'success': True,
+            'message': 'Thank you for contacting us. We will respond shortly.'
+        }
+
+    async def booking(self, scope, receive):
+        """Handle booking requests"""
+        data, errors = booking_validator.validate(await self.read_json(receive))
+        if errors:
+            return 400, {'success': False, 'errors': errors}
+
+        async with self.sessions() as session:
+            # Get room and check availability
+            room = await session.get(Room, data['room_id'])
+            if not room or not room.is_available:
+                return 400, {'success': False, 'message': 'Room not available'}
+
+            # Calculate total price
+            days = (data['check_out'] - data['check_in']).days
+            total_price = days * room.price_per_night
+
+            new_booking = Booking(
+                user_id=self.session_user_id(scope),
+                room_id=data['room_id'],
+                guest_name=data['guest_name'],
+                guest_email=data['guest_email'],
+                guest_phone=data['guest_phone'],
+                check_in=data['check_in'],
+                check_out=data['check_out'],
+                num_guests=data['num_guests'],
+                total_price=total_price,
+                special_requests=data['special_requests']
+            )
+            session.add(new_booking)
+            await session.commit()
+        scope['db_wrote'] = True
+
+        self.in_background(
+            send_booking_confirmation,
+            guest_name=data['guest_name'],
+            guest_email=data['guest_email'],
+            room_name=room.name,
+            check_in=data['check_in'],
+            check_out=data['check_out'],
+            num_guests=data['num_guests'],
+            total_price=total_price
+        )
+        return 200, {
+            'success': True,
+            'message': 'Booking request received. Check your email for confirmation.',
+            'booking_id': new_booking.id
+        }
+
+
+app = APIApplication(flask_app)
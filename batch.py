@@ -0,0 +1,185 @@
+"""Batch admin operations
+
+``apply_batch`` takes a list of operations such as::
+
+    {"resource": "booking", "action": "set_status", "ids": [1, 2, 3], "status": "confirmed"}
+    {"resource": "contact", "action": "delete", "ids": [7, 8]}
+    {"resource": "room", "action": "update", "ids": [2], "fields": {"is_available": false}}
+
+Each operation is checked against the database first (unknown ids, rooms that
+still have bookings) and then applied to the remaining ids with a single
+UPDATE or DELETE statement. All operations share one transaction; items that
+cannot be applied (including every item of an update with an invalid field
+value) are reported back instead of aborting the batch. Booking
+changes also update the report rollups (see rollups.py), and room and booking
+changes are added to the change feed (see changes.py), in that transaction.
+"""
+import math
+
+from sqlalchemy import delete, select, update
+
+from models import db, Booking, Contact, Room, BOOKING_STATUSES, CONTACT_STATUSES
+from rollups import apply_bulk_booking_change
+from changes import record_bulk_change
+
+MAX_BATCH_ITEMS = 1000
+
+
+def _boolean(value):
+    if not isinstance(value, bool):
+        raise ValueError('Expected true or false')
+    return value
+
+
+def _price(value):
+    """A finite price above zero; rejects booleans, NaN and infinity"""
+    if isinstance(value, (int, float, str)) and not isinstance(value, bool):
+        try:
+            price = float(value)
+        except ValueError:
+            price = None
+        if price is not None and math.isfinite(price) and price > 0:
+            return price
+    raise ValueError('Expected a positive number')
+
+
+def _guest_count(value):
+    """A whole number above zero; 2.0 is accepted, 2.7 is not truncated"""
+    if isinstance(value, str):
+        value = int(value) if value.strip().isdigit() else None
+    elif isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+        return value
+    raise ValueError('Expected a whole number above 0')
+
+
+# Room columns that can be changed in bulk, with their coercion
+ROOM_BATCH_FIELDS = {
+    'is_available': _boolean,
+    'is_featured': _boolean,
+    'price_per_night': _price,
+    'max_guests': _guest_count,
+}
+
+BATCH_RESOURCES = {
+    'booking': {'model': Booking, 'statuses': BOOKING_STATUSES, 'actions': ('set_status', 'delete')},
+    'contact': {'model': Contact, 'statuses': CONTACT_STATUSES, 'actions': ('set_status', 'delete')},
+    'room': {'model': Room, 'actions': ('update', 'delete')},
+}
+
+
+class BatchError(ValueError):
+    """Raised when an operation is malformed and cannot be applied at all"""
+
+
+def _parse_operation(operation):
+    """Validate one operation and return (resource, action, ids, values, invalid field errors)"""
+    if not isinstance(operation, dict):
+        raise BatchError('Operation must be an object')
+
+    resource = BATCH_RESOURCES.get(operation.get('resource'))
+    if resource is None:
+        raise BatchError(f"Unknown resource: {operation.get('resource')}")
+
+    action = operation.get('action')
+    if action not in resource['actions']:
+        raise BatchError(f"Unknown action for {operation['resource']}: {action}")
+
+    ids = operation.get('ids')
+    if not isinstance(ids, list) or not ids:
+        raise BatchError('ids must be a non-empty list')
+    try:
+        # Keep the caller's order, drop duplicates
+        ids = list(dict.fromkeys(int(item_id) for item_id in ids))
+    except (TypeError, ValueError):
+        raise BatchError('ids must be integers')
+
+    values = {}
+    invalid = []
+    if action == 'set_status':
+        status = operation.get('status')
+        if status not in resource['statuses']:
+            raise BatchError(f"Invalid status: {status}")
+        values['status'] = status
+    elif action == 'update':
+        fields = operation.get('fields')
+        if not isinstance(fields, dict) or not fields:
+            raise BatchError('fields must be a non-empty object')
+        for name, value in fields.items():
+            if name not in ROOM_BATCH_FIELDS:
+                raise BatchError(f"Field cannot be updated in bulk: {name}")
+            try:
+                values[name] = ROOM_BATCH_FIELDS[name](value)
+            except ValueError as e:
+                invalid.append(f"Invalid value for {name}: {e}")
+
+    return operation['resource'], action, ids, values, invalid
+
+
+def _apply_operation(resource, action, ids, values):
+    """Run one validated operation; returns (succeeded ids, failed items)"""
+    model = BATCH_RESOURCES[resource]['model']
+
+    found = set(db.session.scalars(select(model.id).where(model.id.in_(ids))))
+    failed = [{'id': item_id, 'error': 'Not found'} for item_id in ids if item_id not in found]
+
+    if resource == 'room' and action == 'delete' and found:
+        # Rooms with bookings cannot be deleted without orphaning them
+        booked = set(db.session.scalars(
+            select(Booking.room_id).where(Booking.room_id.in_(found)).distinct()
+        ))
+        failed += [{'id': item_id, 'error': 'Room has bookings'} for item_id in ids if item_id in booked]
+        found -= booked
+
+    if found:
+        if resource == 'booking':
+            # Bulk statements skip ORM flush hooks, so update report rollups here
+            apply_bulk_booking_change(found, None if action == 'delete' else values)
+        # Change feed snapshots: deleted rows before they go, updated rows afterwards
+        if action == 'delete':
+            record_bulk_change(model, found, 'delete')
+            statement = delete(model).where(model.id.in_(found))
+        else:
+            statement = update(model).where(model.id.in_(found)).values(**values)
+        db.session.execute(statement, execution_options={'synchronize_session': False})
+        if action != 'delete':
+            record_bulk_change(model, found, 'update')
+
+    return [item_id for item_id in ids if item_id in found], failed
+
+
+def apply_batch(operations):
+    """Apply a list of admin operations in one transaction with per-item results"""
+    if not isinstance(operations, list) or not operations:
+        raise BatchError('operations must be a non-empty list')
+
+    total_items = sum(
+        len(op['ids']) for op in operations if isinstance(op, dict) and isinstance(op.get('ids'), list)
+    )
+    if total_items > MAX_BATCH_ITEMS:
+        raise BatchError(f'A batch can touch at most {MAX_BATCH_ITEMS} items')
+
+    results = []
+    for index, operation in enumerate(operations):
+        try:
+            resource, action, ids, values, invalid = _parse_operation(operation)
+        except BatchError as e:
+            results.append({'index': index, 'error': str(e), 'succeeded': [], 'failed': []})
+            continue
+
+        if invalid:
+            # Nothing is written; each item reports why
+            succeeded, failed = [], [{'id': item_id, 'error': '; '.join(invalid)} for item_id in ids]
+        else:
+            succeeded, failed = _apply_operation(resource, action, ids, values)
+        results.append({
+            'index': index,
+            'resource': resource,
+            'action': action,
+            'succeeded': succeeded,
+            'failed': failed
+        })
+
+    db.session.commit()
+    return results
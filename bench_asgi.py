@@ -0,0 +1,128 @@
+"""Benchmark: gunicorn sync workers vs the ASGI API under concurrent connections
+
+    python bench_asgi.py [--workers 2] [--duration 5] [--concurrency 1,16,64,256]
+
+Starts `gunicorn -k sync app:app` (overriding the gthread worker in
+gunicorn.conf.py) and `uvicorn asgi:app` with the same number of workers
+against a throwaway SQLite database, then drives each with a keep-alive
+HTTP load generator and reports requests/sec and latency.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(port, path, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}{path}', timeout=1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Server on port {port} did not come up')
+
+
+async def client(port, request, deadline, latencies, errors):
+    """One connection issuing requests back to back until the deadline"""
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.get_extra_info('socket').setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').lower()
+            length = 0
+            for line in head.split('\r\n'):
+                if line.startswith('content-length:'):
+                    length = int(line.split(':', 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if 'connection: close' in head:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError):
+            errors.append(1)
+            if writer is not None:
+                writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, path, concurrency, duration):
+    request = f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: keep-alive\r\n\r\n'.encode()
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*[client(port, request, deadline, latencies, errors) for _ in range(concurrency)])
+    return latencies, len(errors)
+
+
+def report(label, concurrency, duration, latencies, errors):
+    if not latencies:
+        print(f"  {label:<10} {concurrency:>6}  no successful requests ({errors} errors)")
+        return
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"  {label:<10} {concurrency:>6} {len(latencies) / duration:>10,.0f} "
+          f"{statistics.median(latencies) * 1000:>9.1f} {p99 * 1000:>9.1f} {errors:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--concurrency', default='1,16,64,256')
+    parser.add_argument('--path', default='/api/rooms')
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        env.pop('DATABASE_REPLICA_URL', None)
+        subprocess.run([sys.executable, 'init_db.py'], cwd=HERE, env=env, capture_output=True, check=True)
+
+        servers = {
+            'gunicorn': lambda port: [sys.executable, '-m', 'gunicorn', '-w', str(args.workers), '-k', 'sync',
+                                      '-b', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app'],
+            'uvicorn': lambda port: [sys.executable, '-m', 'uvicorn', 'asgi:app', '--port', str(port),
+                                     '--workers', str(args.workers), '--log-level', 'warning'],
+        }
+
+        print(f"{args.path}, {args.workers} worker(s), {args.duration:.0f}s per level")
+        print(f"  {'server':<10} {'conns':>6} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for label, command in servers.items():
+            port = free_port()
+            process = subprocess.Popen(command(port), cwd=HERE, env=env,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                wait_until_up(port, args.path)
+                for concurrency in levels:
+                    latencies, errors = asyncio.run(load(port, args.path, concurrency, args.duration))
+                    report(label, concurrency, args.duration, latencies, errors)
+            finally:
+                process.terminate()
+                process.wait()
+
+
+if __name__ == '__main__':
+    main()
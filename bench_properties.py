@@ -0,0 +1,168 @@
+"""Benchmark: per-property admin queries as properties are added
+
+    python bench_properties.py [bookings_per_property] [steps]
+
+Seeds a throwaway in-memory SQLite database property by property (10 rooms,
+`bookings_per_property` bookings and a fifth as many contact messages each)
+and, at 1, 10 and 100 properties by default, times the dashboard queries and
+an admin search for one property through the central scoping in tenancy.py.
+With the property-scoped composite indexes the timings should stay flat
+while the tables grow; the unscoped count is shown for comparison. The
+search index is shared by all properties, so search time follows the number
+of matches across all of them rather than staying flat.
+"""
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ.pop('DATABASE_REPLICA_URL', None)
+
+from sqlalchemy import func, select, text
+
+from app import app, db
+from models import Booking, Contact, Property, Room, BOOKING_STATUSES, CONTACT_STATUSES
+from rollups import backfill, build_report
+from search import search_records
+from serializers import BookingSchema, ContactSchema
+from tenancy import ensure_default_property, property_scope
+
+ROOMS = 10
+
+# Every hundredth guest has this name, so a search for it has a few hits per property
+RARE_NAME = 'Mia Lin'
+
+
+def add_property(index, bookings):
+    """Insert one property with its rooms, bookings and contact messages"""
+    if index == 0:
+        property_id = ensure_default_property()
+    else:
+        property_id = db.session.execute(Property.__table__.insert().values(
+            slug=f'property-{index}', name=f'Property {index}'
+        )).inserted_primary_key[0]
+
+    db.session.execute(Room.__table__.insert(), [{
+        'property_id': property_id,
+        'name': f'Room {i}',
+        'room_type': 'Double',
+        'description': 'Benchmark room',
+        'image_url': 'https://example.com/room.jpg',
+        'price_per_night': 3000 + i * 100,
+        'max_guests': 2,
+        'is_available': i % 4 != 0,
+    } for i in range(ROOMS)])
+    room_ids = db.session.scalars(
+        select(Room.id).where(Room.property_id == property_id).execution_options(all_properties=True)
+    ).all()
+
+    rng = random.Random(index)
+    start = date.today() - timedelta(days=730)
+    rows = []
+    for n in range(bookings):
+        check_in = start + timedelta(days=rng.randint(0, 760))
+        nights = rng.randint(1, 5)
+        rows.append({
+            'property_id': property_id,
+            'room_id': rng.choice(room_ids),
+            'guest_name': RARE_NAME if n % 100 == 0 else 'Guest',
+            'guest_email': 'guest@example.com',
+            'check_in': check_in,
+            'check_out': check_in + timedelta(days=nights),
+            'num_guests': 2,
+            'total_price': nights * 3500,
+            'status': rng.choice(BOOKING_STATUSES),
+            'created_at': datetime.combine(check_in, datetime.min.time()) - timedelta(days=rng.randint(0, 90)),
+        })
+    db.session.execute(Booking.__table__.insert(), rows)
+
+    db.session.execute(Contact.__table__.insert(), [{
+        'property_id': property_id,
+        'name': RARE_NAME if n % 100 == 0 else 'Guest',
+        'email': 'guest@example.com',
+        'message': 'Is the room available?',
+        'status': rng.choice(CONTACT_STATUSES),
+        'created_at': datetime.utcnow() - timedelta(minutes=rng.randint(0, 10 ** 6)),
+    } for n in range(bookings // 5)])
+    db.session.commit()
+    return property_id
+
+
+def newest(schema_class):
+    schema = schema_class()
+    model = schema_class.model
+    statement = schema.select().order_by(model.created_at.desc(), model.id.desc()).limit(50)
+    return db.session.execute(statement).all()
+
+
+def dashboard_counts():
+    return (
+        db.session.scalar(select(func.count(Booking.id)).where(Booking.status == 'pending')),
+        db.session.scalar(select(func.count(Contact.id)).where(Contact.status == 'new')),
+        db.session.scalars(select(Room).where(Room.is_available.is_(True))).all(),
+    )
+
+
+def upcoming_arrivals():
+    today = date.today()
+    return db.session.scalars(
+        select(Booking).where(Booking.check_in >= today, Booking.check_in < today + timedelta(days=14))
+    ).all()
+
+
+QUERIES = [
+    ('bookings page', lambda: newest(BookingSchema)),
+    ('contacts page', lambda: newest(ContactSchema)),
+    ('dashboard counts', dashboard_counts),
+    ('arrivals (14 days)', upcoming_arrivals),
+    ('monthly report', lambda: build_report(group_by='month')),
+    ('search', lambda: search_records('lin')),
+]
+
+
+def best_of(func, repeat=7):
+    best = None
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    bookings = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    steps = [int(step) for step in sys.argv[2].split(',')] if len(sys.argv) > 2 else [1, 10, 100]
+
+    with app.app_context():
+        db.create_all(bind_key=None)
+        print(f"{bookings:,} bookings and {bookings // 5:,} messages per property; times for property 1 (ms)")
+        print(f"{'properties':>10} {'bookings':>9} " + ' '.join(f'{label:>18}' for label, _ in QUERIES)
+              + f" {'unscoped count':>15}")
+
+        added = 0
+        for step in steps:
+            while added < step:
+                add_property(added, bookings)
+                added += 1
+            backfill()
+
+            with property_scope(1):
+                timings = [best_of(query) for _, query in QUERIES]
+            total = db.session.scalar(select(func.count(Booking.id)))
+            unscoped = best_of(lambda: db.session.scalar(select(func.count(Booking.id))))
+            print(f"{added:>10} {total:>9,} " + ' '.join(f'{ms:>18.2f}' for ms in timings) + f" {unscoped:>15.2f}")
+
+        # The filter the scoping hook adds, spelled out so the statement can be compiled here
+        statement = (BookingSchema().select().where(Booking.property_id == 1)
+                     .order_by(Booking.created_at.desc()).limit(50))
+        compiled = statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+        plan = db.session.execute(text(f'EXPLAIN QUERY PLAN {compiled}')).all()
+        print('bookings page plan:', '; '.join(row[-1] for row in plan))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Benchmark: monthly revenue/occupancy report from raw bookings vs rollups
+
+    python bench_reports.py [years] [bookings_per_day]
+
+Seeds a throwaway in-memory SQLite database with `years` of bookings, builds
+the rollups with a backfill, then times a per-month report over the whole
+range computed on the fly from ``bookings`` and via ``build_report``.
+"""
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ.pop('DATABASE_REPLICA_URL', None)
+
+from sqlalchemy import select
+
+from app import app, db
+from models import Booking, Room, BOOKING_STATUSES
+from rollups import backfill, build_report, check_rollups
+from tenancy import ensure_default_property
+
+ROOMS = 10
+
+
+def seed(years, per_day):
+    property_id = ensure_default_property()
+    db.session.execute(Room.__table__.insert(), [{
+        'property_id': property_id,
+        'name': f'Room {i}',
+        'room_type': 'Double',
+        'description': 'Benchmark room',
+        'image_url': 'https://example.com/room.jpg',
+        'price_per_night': 3000 + i * 100,
+        'max_guests': 2,
+    } for i in range(ROOMS)])
+
+    random.seed(1)
+    start = date.today() - timedelta(days=365 * years)
+    rows = []
+    for offset in range(365 * years):
+        check_in = start + timedelta(days=offset)
+        for _ in range(per_day):
+            nights = random.randint(1, 5)
+            rows.append({
+                'property_id': property_id,
+                'room_id': random.randint(1, ROOMS),
+                'guest_name': 'Guest',
+                'guest_email': 'guest@example.com',
+                'guest_phone': '0912-345-678',
+                'check_in': check_in,
+                'check_out': check_in + timedelta(days=nights),
+                'num_guests': 2,
+                'total_price': nights * 3500,
+                'status': random.choice(BOOKING_STATUSES),
+                'created_at': check_in - timedelta(days=random.randint(0, 90)),
+            })
+    db.session.execute(Booking.__table__.insert(), rows)
+    db.session.commit()
+    return start, len(rows)
+
+
+def report_from_bookings(start, end):
+    """Per-month nights and revenue by scanning every overlapping booking"""
+    months = defaultdict(lambda: [0, 0.0])
+    rows = db.session.execute(
+        select(Booking.check_in, Booking.check_out, Booking.total_price)
+        .where(Booking.check_out > start, Booking.check_in <= end, Booking.status != 'cancelled')
+    )
+    for check_in, check_out, total_price in rows:
+        nights = (check_out - check_in).days
+        for offset in range(nights):
+            day = check_in + timedelta(days=offset)
+            if start <= day <= end:
+                month = months[day.strftime('%Y-%m')]
+                month[0] += 1
+                month[1] += total_price / nights
+    return months
+
+
+def measure(label, func, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {label:<28} {best * 1000:>9.1f} ms")
+
+
+def main():
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    per_day = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    with app.app_context():
+        db.create_all(bind_key=None)
+        start, count = seed(years, per_day)
+        began = time.perf_counter()
+        rollup_rows = backfill()
+        print(f"{count:,} bookings over {years} years, {ROOMS} rooms; "
+              f"backfill {rollup_rows:,} rollup rows in {time.perf_counter() - began:.2f}s")
+        assert not check_rollups()
+
+        end = date.today()
+        print(f"Monthly report {start} .. {end}:")
+        measure('raw bookings scan', lambda: report_from_bookings(start, end))
+        measure('rollups (group_by=month)', lambda: build_report(start.isoformat(), end.isoformat(), 'month'))
+        measure('rollups (group_by=room)', lambda: build_report(start.isoformat(), end.isoformat(), 'room'))
+
+
+if __name__ == '__main__':
+    main()
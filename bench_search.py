@@ -0,0 +1,140 @@
+"""Benchmark: admin search latency over a million contact messages and bookings
+
+    python bench_search.py [rows]
+
+Seeds a throwaway SQLite database with `rows` records (default 1,000,000:
+two thirds contact messages, one third bookings) with varied names, emails,
+phones and message text, then times ``search_records`` for one property,
+the way /admin/search runs it, from rare names up to one-letter prefixes
+that match almost everything. The target is 50 ms per search.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'search.db')}"
+os.environ.pop('DATABASE_REPLICA_URL', None)
+
+from app import app, db
+from models import Booking, Contact, Room
+from search import search_records
+from tenancy import ensure_default_property, property_scope
+
+TARGET_MS = 50
+BATCH = 20000
+
+FIRST_NAMES = ['Ann', 'Chen', 'Mia', 'Wei', 'Yu', 'Hao', 'Lin', 'Grace', 'Kevin', 'Jia', 'Tom', 'Ivy', 'Leo', 'Amy', 'Ray']
+LAST_NAMES = ['Lee', 'Wang', 'Chang', 'Liu', 'Huang', 'Wu', 'Tsai', 'Yang', 'Hsu', 'Lin', 'Smith', 'Garcia', 'Kuo']
+WORDS = ['room', 'garden', 'breakfast', 'parking', 'late', 'arrival', 'early', 'view', 'family', 'quiet', 'bike',
+         'airport', 'pickup', 'vegetarian', 'balcony', 'anniversary', 'crib', 'towels', 'hiking', 'train', 'station',
+         'refund', 'invoice', 'weekend', 'mountain', 'river', 'tea', 'dinner', 'taxi', 'luggage']
+
+SEARCHES = [
+    ('no match', 'zzqx'),
+    ('email', 'guest123456@example.com'),
+    ('phone digits', '0912000123'),
+    ('full name', 'grace huang'),
+    ('two common words', 'anniversary crib'),
+    ('common word', 'garden'),
+    ('two-letter prefix', 'ga'),
+    ('one-letter prefix', 'g'),
+]
+
+
+def guest(rng, i):
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    return f'{first} {last}', f'guest{i}@example.com', f'0912-{i // 1000 % 1000:03d}-{i % 1000:03d}'
+
+
+def seed(rows, rng):
+    property_id = ensure_default_property()
+    db.session.execute(Room.__table__.insert(), [{
+        'property_id': property_id,
+        'name': f'Room {i}',
+        'room_type': 'Double',
+        'description': 'Benchmark room',
+        'image_url': 'https://example.com/room.jpg',
+        'price_per_night': 3000,
+        'max_guests': 2,
+    } for i in range(10)])
+
+    contacts = rows * 2 // 3
+    created = datetime.utcnow() - timedelta(days=1000)
+    for start in range(0, contacts, BATCH):
+        batch = []
+        for i in range(start, min(start + BATCH, contacts)):
+            name, email, phone = guest(rng, i)
+            batch.append({
+                'property_id': property_id,
+                'name': name,
+                'email': email,
+                'phone': phone,
+                'subject': ' '.join(rng.sample(WORDS, 2)),
+                'message': ' '.join(rng.choice(WORDS) for _ in range(12)),
+                'status': 'new',
+                'created_at': created + timedelta(minutes=i),
+            })
+        db.session.execute(Contact.__table__.insert(), batch)
+        db.session.commit()
+
+    check_in = date.today()
+    for start in range(contacts, rows, BATCH):
+        batch = []
+        for i in range(start, min(start + BATCH, rows)):
+            name, email, phone = guest(rng, i)
+            batch.append({
+                'property_id': property_id,
+                'room_id': rng.randint(1, 10),
+                'guest_name': name,
+                'guest_email': email,
+                'guest_phone': phone,
+                'check_in': check_in,
+                'check_out': check_in + timedelta(days=2),
+                'num_guests': 2,
+                'total_price': 6000,
+                'status': 'pending',
+                'special_requests': ' '.join(rng.choice(WORDS) for _ in range(4)) if i % 3 == 0 else None,
+                'created_at': created + timedelta(minutes=i),
+            })
+        db.session.execute(Booking.__table__.insert(), batch)
+        db.session.commit()
+    return property_id
+
+
+def best_of(func, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rng = random.Random(5)
+
+    with app.app_context():
+        db.create_all(bind_key=None)
+        start = time.perf_counter()
+        property_id = seed(rows, rng)
+        print(f"seeded {rows:,} rows in {time.perf_counter() - start:.0f}s; best of 5, one property selected")
+        print(f"{'search':<20} {'query':<26} {'hits':>6} {'page 1 ms':>10} {'page 5 ms':>10}")
+
+        slow = 0
+        with property_scope(property_id):
+            for label, query in SEARCHES:
+                first_ms, result = best_of(lambda: search_records(query))
+                fifth_ms, _ = best_of(lambda: search_records(query, page=5))
+                hits = f"{result['total']}{'+' if result['total_capped'] else ''}"
+                slow += max(first_ms, fifth_ms) > TARGET_MS
+                print(f"{label:<20} {query:<26} {hits:>6} {first_ms:>10.1f} {fifth_ms:>10.1f}")
+        print(f"{slow} of {len(SEARCHES)} searches over {TARGET_MS} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Micro-benchmark: rows/sec for serializing rooms and bookings
+
+Compares the old approach (load ORM objects, build dicts by hand, encode with
+the stdlib json module) against the column-based schemas in serializers.py.
+Runs against a throwaway in-memory SQLite database:
+
+    python bench_serializers.py [rows]
+"""
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ.pop('DATABASE_REPLICA_URL', None)
+
+from app import app, db
+from models import Room, Booking
+from serializers import RoomSchema, BookingSchema, dumps, orjson
+from tenancy import ensure_default_property
+
+
+def seed(rows):
+    """Insert `rows` rooms and `rows` bookings"""
+    property_id = ensure_default_property()
+    db.session.execute(Room.__table__.insert(), [{
+        'property_id': property_id,
+        'name': f'Room {i}',
+        'room_type': 'Double',
+        'description': 'Panoramic views of the Central Mountain Range with private balcony.',
+        'image_url': f'https://example.com/rooms/{i}.jpg',
+        'price_per_night': 3000 + i % 10 * 100,
+        'max_guests': 2,
+        'amenities': 'wifi,ac_unit,bathtub',
+        'is_available': True,
+        'is_featured': i % 3 == 0
+    } for i in range(rows)])
+    check_in = date.today() + timedelta(days=30)
+    db.session.execute(Booking.__table__.insert(), [{
+        'property_id': property_id,
+        'room_id': i % rows + 1,
+        'guest_name': f'Guest {i}',
+        'guest_email': f'guest{i}@example.com',
+        'guest_phone': '0912-345-678',
+        'check_in': check_in,
+        'check_out': check_in + timedelta(days=2),
+        'num_guests': 2,
+        'total_price': 7000,
+        'status': 'pending',
+        'special_requests': 'Late arrival',
+    } for i in range(rows)])
+    db.session.commit()
+
+
+def rooms_by_hand():
+    rooms = Room.query.filter_by(is_available=True).all()
+    return json.dumps([{
+        'id': room.id,
+        'name': room.name,
+        'type': room.room_type,
+        'description': room.description,
+        'amenities': room.amenities.split(',') if room.amenities else [],
+        'price_per_night': room.price_per_night,
+        'image': room.image_url
+    } for room in rooms])
+
+
+def rooms_by_schema():
+    schema = RoomSchema()
+    rows = db.session.execute(schema.select().where(Room.is_available.is_(True))).all()
+    return dumps(schema.dump_rows(rows))
+
+
+def bookings_by_hand():
+    bookings = Booking.query.all()
+    return json.dumps([{
+        'id': booking.id,
+        'room_id': booking.room_id,
+        'user_id': booking.user_id,
+        'guest_name': booking.guest_name,
+        'guest_email': booking.guest_email,
+        'guest_phone': booking.guest_phone,
+        'check_in': booking.check_in.isoformat(),
+        'check_out': booking.check_out.isoformat(),
+        'num_guests': booking.num_guests,
+        'total_price': booking.total_price,
+        'status': booking.status,
+        'special_requests': booking.special_requests,
+        'created_at': booking.created_at.isoformat(),
+        'updated_at': booking.updated_at.isoformat()
+    } for booking in bookings])
+
+
+def bookings_by_schema():
+    schema = BookingSchema()
+    return dumps(schema.dump_rows(db.session.execute(schema.select()).all()))
+
+
+def measure(label, func, rows, repeat=5):
+    """Best-of-`repeat` rows/sec for one serializer"""
+    best = None
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<28} {rows / best:>12,.0f} rows/sec")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    with app.app_context():
+        db.create_all(bind_key=None)
+        seed(rows)
+        print(f"{rows:,} rows, JSON backend: {'orjson' if orjson else 'json'}")
+        measure('rooms: ORM + jsonify-style', rooms_by_hand, rows)
+        measure('rooms: RoomSchema', rooms_by_schema, rows)
+        measure('bookings: ORM + by hand', bookings_by_hand, rows)
+        measure('bookings: BookingSchema', bookings_by_schema, rows)
+
+
+if __name__ == '__main__':
+    main()
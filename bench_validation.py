@@ -0,0 +1,89 @@
+"""Micro-benchmark: validations/sec for the JSON API payloads
+
+Compares building the WTForms classes per request (as the routes used to)
+against the compiled validators in validation.py, for valid and invalid
+contact and booking payloads:
+
+    python bench_validation.py [seconds_per_case]
+"""
+import json
+import sys
+import time
+from datetime import date, timedelta
+
+from flask import request
+
+from app import app
+from forms import BookingForm, ContactForm
+from validation import booking_validator, contact_validator
+
+CHECK_IN = date.today() + timedelta(days=14)
+
+CASES = [
+    ('contact, valid', ContactForm, contact_validator, {
+        'name': 'Ann Lee',
+        'email': 'ann.lee@example.com',
+        'phone': '0912-345-678',
+        'subject': 'Room question',
+        'message': 'Do you have a family room for next weekend?',
+    }),
+    ('contact, invalid', ContactForm, contact_validator, {
+        'name': 'A',
+        'email': 'not-an-email',
+        'message': 'Hi',
+    }),
+    ('booking, valid', BookingForm, booking_validator, {
+        'room_id': 1,
+        'guest_name': 'Ann Lee',
+        'guest_email': 'ann.lee@example.com',
+        'guest_phone': '0912345678',
+        'check_in': CHECK_IN.isoformat(),
+        'check_out': (CHECK_IN + timedelta(days=2)).isoformat(),
+        'num_guests': 2,
+        'special_requests': 'Late arrival',
+    }),
+    ('booking, invalid', BookingForm, booking_validator, {
+        'room_id': 1,
+        'guest_name': 'Ann Lee',
+        'guest_email': 'ann.lee@example.com',
+        'guest_phone': '123',
+        'check_in': CHECK_IN.isoformat(),
+        'check_out': CHECK_IN.isoformat(),
+        'num_guests': 12,
+    }),
+]
+
+
+def rate(func, seconds):
+    """Calls per second over roughly `seconds`"""
+    calls, start = 0, time.perf_counter()
+    while True:
+        for _ in range(200):
+            func()
+        calls += 200
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return calls / elapsed
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 1
+    print(f"{'payload':<18} {'WTForms/sec':>12} {'compiled/sec':>13} {'speedup':>8}")
+    for label, form_class, validator, payload in CASES:
+        body = json.dumps(payload)
+        with app.test_request_context('/api/bench', method='POST', data=body, content_type='application/json'):
+            request.get_json()
+
+            def with_form():
+                form_class(data=request.get_json(), meta={'csrf': False}).validate()
+
+            def with_validator():
+                validator.validate(request.get_json())
+
+            forms = rate(with_form, seconds)
+            compiled = rate(with_validator, seconds)
+        print(f"{label:<18} {forms:>12,.0f} {compiled:>13,.0f} {compiled / forms:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,340 @@
+"""Change feed for rooms and bookings (channel-manager sync)
+
+Every insert, update and delete of a room, booking or contact message
+appends a row to ``change_log`` in the same transaction: ORM writes through
+a session ``after_flush`` hook, bulk statements from batch.py through
+``record_bulk_change``. Inserts and updates store the row as the JSON API
+serializes it (``RoomSchema`` / ``BookingSchema`` / ``ContactSchema``),
+deletes store only the id. Contact messages are only logged for the live
+admin dashboard (live.py); the public feed serves rooms and bookings.
+
+``GET /api/changes?since=<cursor>`` returns the entries after a cursor in
+commit order. On PostgreSQL entries are ordered by writing transaction and
+those of transactions still in progress are held back, so a consumer never
+moves its cursor past a change that has not committed yet.
+
+Compaction drops entries that a later entry for the same row supersedes.
+Replaying the feed from any cursor still ends in the current state, and
+deleted rows keep a single delete entry.
+
+    python changes.py check              # replay the feed and compare with the tables
+    python changes.py compact [--days N] # drop superseded entries older than N days
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, inspect, select, tuple_
+from sqlalchemy.orm import aliased
+
+from models import db, Booking, ChangeLog, Contact, Room
+from serializers import BookingSchema, ContactSchema, RoomSchema
+
+# Tracked models: entity name and the schema used for their snapshots
+TRACKED = {
+    Room: ('room', RoomSchema(only=list(RoomSchema.fields))),
+    Booking: ('booking', BookingSchema()),
+    Contact: ('contact', ContactSchema()),
+}
+ENTITIES = {entity: (model, schema) for model, (entity, schema) in TRACKED.items()}
+
+# Entities served by /api/changes
+FEED_ENTITIES = ('room', 'booking')
+
+MAX_PAGE_SIZE = 1000
+
+MAX_ENTRY_ID = 2 ** 63 - 1
+
+
+# Cursors
+
+def format_cursor(txid, entry_id):
+    return f'{txid}-{entry_id}'
+
+
+def parse_cursor(cursor):
+    """(txid, id) for a cursor, or None for the start of the feed"""
+    if not cursor or cursor == '0':
+        return None
+    try:
+        txid, entry_id = cursor.split('-')
+        return int(txid), int(entry_id)
+    except ValueError:
+        raise ValueError(f'Invalid cursor: {cursor}')
+
+
+# Recording changes
+
+def _insert_statement(connection):
+    statement = ChangeLog.__table__.insert()
+    if connection.dialect.name == 'postgresql':
+        # 64-bit, never wraps; assigned when the transaction first writes
+        statement = statement.values(txid=func.txid_current())
+    return statement
+
+
+def _snapshots(connection, entity, ids):
+    """(property_id, id, data) for rows as they are now in this transaction"""
+    model, schema = ENTITIES[entity]
+    statement = schema.select().add_columns(model.property_id).where(model.id.in_(ids))
+    return [(row[-1], row[0], schema.dump_row(row[:-1])) for row in connection.execute(statement)]
+
+
+def _write(connection, entity, operation, rows):
+    if rows:
+        connection.execute(_insert_statement(connection), [{
+            'property_id': property_id,
+            'entity': entity,
+            'entity_id': entity_id,
+            'operation': operation,
+            'data': data,
+        } for property_id, entity_id, data in rows])
+
+
+def _column_changed(obj):
+    state = inspect(obj)
+    return any(state.attrs[attr.key].history.has_changes() for attr in state.mapper.column_attrs)
+
+
+def _track_changes(session, flush_context):
+    """Log the tracked rows written by this flush"""
+    written = {}
+    for obj in session.new:
+        if type(obj) in TRACKED:
+            written.setdefault((TRACKED[type(obj)][0], 'insert'), []).append(obj.id)
+    for obj in session.dirty:
+        if type(obj) in TRACKED and _column_changed(obj):
+            written.setdefault((TRACKED[type(obj)][0], 'update'), []).append(obj.id)
+    deleted = {}
+    for obj in session.deleted:
+        if type(obj) in TRACKED:
+            deleted.setdefault(TRACKED[type(obj)][0], []).append((obj.property_id, obj.id, None))
+
+    if not written and not deleted:
+        return
+    connection = session.connection()
+    for (entity, operation), ids in written.items():
+        _write(connection, entity, operation, _snapshots(connection, entity, ids))
+    for entity, rows in deleted.items():
+        _write(connection, entity, 'delete', rows)
+    session.info['change_feed_written'] = True
+
+
+def record_bulk_change(model, ids, operation):
+    """Log a bulk change; call after an UPDATE, but before a DELETE"""
+    if model not in TRACKED:
+        return
+    entity = TRACKED[model][0]
+    connection = db.session.connection()
+    rows = _snapshots(connection, entity, ids)
+    if operation == 'delete':
+        rows = [(property_id, entity_id, None) for property_id, entity_id, _ in rows]
+    _write(connection, entity, operation, rows)
+    db.session.info['change_feed_written'] = True
+
+
+class ChangeSignal:
+    """Wakes long-polling readers in this process when changes commit"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._generation = 0
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def notify(self):
+        with self._condition:
+            self._generation += 1
+            self._condition.notify_all()
+
+    def wait(self, generation, timeout):
+        """Wait until notified after `generation` was read, or for `timeout` seconds"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._generation != generation, timeout)
+
+
+change_signal = ChangeSignal()
+
+
+def _notify_after_commit(session):
+    if session.info.pop('change_feed_written', False):
+        change_signal.notify()
+
+
+def _forget_after_rollback(session):
+    session.info.pop('change_feed_written', None)
+
+
+# Registered by create_app() (see db_routing.init_session_hooks)
+CHANGE_LOG_HOOKS = [
+    ('after_flush', _track_changes),
+    ('after_commit', _notify_after_commit),
+    ('after_rollback', _forget_after_rollback),
+]
+
+
+# Reading the feed
+
+def _entry(entry):
+    return {
+        'cursor': format_cursor(entry.txid, entry.id),
+        'entity': entry.entity,
+        'id': entry.entity_id,
+        'operation': entry.operation,
+        'data': entry.data,
+        'changed_at': entry.created_at.isoformat() if entry.created_at else None
+    }
+
+
+def _committed(statement):
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # Hold back transactions that may still commit, or earlier entries could appear later
+        statement = statement.where(ChangeLog.txid < func.txid_snapshot_xmin(func.txid_current_snapshot()))
+    return statement
+
+
+def read_entries(position=None, limit=100, entities=FEED_ENTITIES):
+    """Up to `limit` + 1 log entries after a (txid, id) position, oldest first"""
+    statement = _committed(select(ChangeLog).order_by(ChangeLog.txid, ChangeLog.id).limit(limit + 1))
+    if position is not None:
+        statement = statement.where(tuple_(ChangeLog.txid, ChangeLog.id) > tuple_(*position))
+    if entities is not None:
+        statement = statement.where(ChangeLog.entity.in_(entities))
+    return db.session.scalars(statement).all()
+
+
+def committed_head():
+    """Position up to which every entry (of any property) has committed and is readable"""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        xmin = db.session.scalar(select(func.txid_snapshot_xmin(func.txid_current_snapshot())))
+        return xmin - 1, MAX_ENTRY_ID
+    last_id = db.session.scalar(select(func.max(ChangeLog.id)).execution_options(all_properties=True))
+    return 0, last_id or 0
+
+
+def read_changes(since=None, limit=100, entities=FEED_ENTITIES):
+    """One page of the feed after a cursor, scoped to the selected property"""
+    entries = read_entries(parse_cursor(since), limit, entities)
+    changes = [_entry(entry) for entry in entries[:limit]]
+    return {
+        'changes': changes,
+        'cursor': changes[-1]['cursor'] if changes else (since or '0'),
+        'has_more': len(entries) > limit
+    }
+
+
+def init_change_feed(app):
+    """Register this process's long-poll slots for /api/changes"""
+    app.extensions['change_feed_waiters'] = threading.BoundedSemaphore(app.config.get('CHANGE_FEED_MAX_WAITERS', 2))
+
+
+def wait_for_changes(since=None, limit=100, timeout=0, poll_interval=1.0):
+    """Like read_changes, but wait up to `timeout` seconds for the first change"""
+    deadline = time.monotonic() + timeout
+    while True:
+        generation = change_signal.generation
+        feed = read_changes(since, limit)
+        remaining = deadline - time.monotonic()
+        if feed['changes'] or remaining <= 0:
+            return feed
+        # Give the connection back while waiting; other processes' writes are seen by polling
+        db.session.rollback()
+        change_signal.wait(generation, min(remaining, poll_interval))
+
+
+# Compaction and replay
+
+def compact_changes(older_than_days=30):
+    """Delete entries superseded by a later entry for the same row; returns the count"""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    newer = aliased(ChangeLog)
+    superseded = select(newer.id).where(
+        newer.entity == ChangeLog.entity,
+        newer.entity_id == ChangeLog.entity_id,
+        tuple_(newer.txid, newer.id) > tuple_(ChangeLog.txid, ChangeLog.id)
+    ).exists()
+    result = db.session.execute(
+        delete(ChangeLog).where(ChangeLog.created_at < cutoff, superseded),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def replay(changes, state=None):
+    """Apply feed entries to {entity: {id: data}}"""
+    state = state if state is not None else {entity: {} for entity in FEED_ENTITIES}
+    for change in changes:
+        rows = state.setdefault(change['entity'], {})
+        if change['operation'] == 'delete':
+            rows.pop(change['id'], None)
+        else:
+            rows[change['id']] = change['data']
+    return state
+
+
+def current_state():
+    """{entity: {id: data}} read from the tables, scoped like the feed"""
+    state = {}
+    for entity in FEED_ENTITIES:
+        model, schema = ENTITIES[entity]
+        rows = db.session.execute(schema.select()).all()
+        state[entity] = {row[0]: schema.dump_row(row) for row in rows}
+    return state
+
+
+def check_feed():
+    """Differences between a full replay of the feed and the tables"""
+    state, cursor = None, None
+    while True:
+        feed = read_changes(cursor, MAX_PAGE_SIZE)
+        state = replay(feed['changes'], state)
+        cursor = feed['cursor']
+        if not feed['has_more']:
+            break
+
+    expected = current_state()
+    mismatches = []
+    for entity, rows in expected.items():
+        replayed = state.get(entity, {})
+        for entity_id in sorted(set(rows) | set(replayed)):
+            if rows.get(entity_id) != replayed.get(entity_id):
+                mismatches.append({
+                    'entity': entity,
+                    'id': entity_id,
+                    'expected': rows.get(entity_id),
+                    'replayed': replayed.get(entity_id)
+                })
+    return mismatches
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    from app import app
+    from models import Property
+    from tenancy import property_scope
+
+    parser = argparse.ArgumentParser(description='Maintain the room/booking change feed')
+    parser.add_argument('command', choices=['check', 'compact'])
+    parser.add_argument('--days', type=int, default=30, help='compact entries older than this (default 30)')
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all(bind_key=None)
+        if args.command == 'compact':
+            print(f"Removed {compact_changes(args.days)} superseded change log entries")
+        else:
+            failed = False
+            for property_id, slug in db.session.execute(select(Property.id, Property.slug)).all():
+                with property_scope(property_id):
+                    mismatches = check_feed()
+                for mismatch in mismatches[:20]:
+                    print(f"  {slug}: {mismatch['entity']} {mismatch['id']}: "
+                          f"expected {mismatch['expected']}, replayed {mismatch['replayed']}")
+                print(f"{slug}: {len(mismatches)} differences")
+                failed = failed or bool(mismatches)
+            sys.exit(1 if failed else 0)
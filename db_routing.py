@@ -0,0 +1,151 @@
+"""Read-replica routing for the database session
+
+Routes decorated with ``@read_only`` run their queries against the optional
+``replica`` bind (``DATABASE_REPLICA_URL``). Everything else, including any
+flush, goes to the primary. A user who has just written something is pinned
+to the primary for a few seconds so they always see their own booking or
+registration, and the replica is skipped while it is unreachable or lagging.
+"""
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, orm, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql.dml import UpdateBase
+
+REPLICA_BIND = 'replica'
+
+# Replay lag in seconds; NULL when the server is not a streaming replica
+POSTGRES_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+""")
+
+
+class ReplicaHealth:
+    """Cached health and lag probe for the replica engine"""
+
+    def __init__(self, max_lag, interval):
+        self.max_lag = max_lag
+        self.interval = interval
+        self._healthy = True
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def is_healthy(self, engine):
+        """Return the cached health, re-probing at most once per interval"""
+        if self._is_fresh():
+            return self._healthy
+        with self._lock:
+            # Another thread may have probed while we waited for the lock
+            if not self._is_fresh():
+                self._healthy = self._probe(engine)
+                self._checked_at = time.monotonic()
+        return self._healthy
+
+    def mark_unhealthy(self):
+        """Take the replica out of rotation until the next probe"""
+        self._healthy = False
+        self._checked_at = time.monotonic()
+
+    def _is_fresh(self):
+        return self._checked_at is not None and time.monotonic() - self._checked_at < self.interval
+
+    def _probe(self, engine):
+        try:
+            with engine.connect() as conn:
+                if engine.dialect.name == 'postgresql':
+                    lag = conn.execute(POSTGRES_LAG_QUERY).scalar()
+                else:
+                    conn.execute(text('SELECT 1'))
+                    lag = None
+        except Exception as e:
+            print(f"Replica health check failed: {e}")
+            return False
+
+        if lag is not None and float(lag) > self.max_lag:
+            print(f"Replica lagging by {float(lag):.1f}s, using primary")
+            return False
+        return True
+
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica when the request allows it"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and not isinstance(clause, UpdateBase)
+                and has_request_context() and g.get('db_replica')):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _remember_write(db_session):
+    """Flag the request so the client is pinned to the primary afterwards"""
+    if has_request_context():
+        g.db_wrote = True
+
+
+def init_session_hooks(*hook_lists):
+    """Register (event, function) hooks from tenancy, rollups and changes
+
+    On SQLAlchemy's base Session rather than RoutingSession, so the async
+    API's sessions run them too.
+    """
+    for hooks in hook_lists:
+        for identifier, fn in hooks:
+            if not event.contains(orm.Session, identifier, fn):
+                event.listen(orm.Session, identifier, fn)
+
+
+def _replica_available():
+    """Decide whether the current request may read from the replica"""
+    engines = current_app.extensions['sqlalchemy'].engines
+    if REPLICA_BIND not in engines:
+        return False
+
+    # Read-your-writes: stay on the primary right after this client wrote
+    if session.get('db_primary_until', 0) > time.time():
+        return False
+
+    return current_app.extensions['db_routing'].is_healthy(engines[REPLICA_BIND])
+
+
+def read_only(f):
+    """Decorator to serve a route from the read replica when possible"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.db_replica = _replica_available()
+        if not g.db_replica:
+            return f(*args, **kwargs)
+
+        try:
+            return f(*args, **kwargs)
+        except OperationalError as e:
+            # Replica failed mid-request: drop it and retry once on the primary
+            print(f"Replica query failed, retrying on primary: {e}")
+            current_app.extensions['db_routing'].mark_unhealthy()
+            current_app.extensions['sqlalchemy'].session.rollback()
+            g.db_replica = False
+            return f(*args, **kwargs)
+    return decorated_function
+
+
+def init_db_routing(app):
+    """Register replica health state and read-your-writes stickiness"""
+    app.extensions['db_routing'] = ReplicaHealth(
+        max_lag=app.config.get('DATABASE_REPLICA_MAX_LAG', 5),
+        interval=app.config.get('DATABASE_REPLICA_CHECK_INTERVAL', 5)
+    )
+
+    @app.after_request
+    def stick_to_primary_after_write(response):
+        if g.get('db_wrote') and REPLICA_BIND in app.config.get('SQLALCHEMY_BINDS', {}):
+            sticky = app.config.get('DATABASE_REPLICA_STICKY_SECONDS', 10)
+            session['db_primary_until'] = time.time() + sticky
+        return response
@@ -0,0 +1,17 @@
+"""Gunicorn settings (loaded automatically by `gunicorn app:app`)"""
+import os
+
+# Threaded workers: an open /admin/events stream or a waiting /api/changes long-poll holds one
+# thread. Each worker allows ADMIN_EVENTS_MAX_STREAMS (3) streams and CHANGE_FEED_MAX_WAITERS (2)
+# long-polls, so at least GUNICORN_THREADS - 5 threads stay free for pages; keep the sum below it
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+
+def post_worker_init(worker):
+    """Warm the worker up in the background; requests wait for it, /ready answers 503 until then"""
+    from app import app
+    from warmup import start_warm_up
+
+    start_warm_up(app, lambda state: worker.log.info("Worker warmed up in %.3fs %s", state['seconds'], state['steps']))
@@ -1,12 +1,17 @@
 """Initialize database with sample data"""
 from app import app, db
 from models import Room, User
+from search import create_search_index
+from tenancy import upgrade_schema, partition_bookings
 
 def init_db():
     """Create tables and add sample rooms"""
     with app.app_context():
-        # Create all tables
-        db.create_all()
+        # Create all tables (and add property columns to older databases)
+        upgrade_schema()
+        create_search_index()
+        if app.config['PARTITION_BOOKINGS']:
+            partition_bookings()
         
         # Check if rooms already exist
         if Room.query.count() > 0:
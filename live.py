@@ -0,0 +1,267 @@
+"""Live admin dashboard: server-sent events at /admin/events
+
+Bookings and contact messages are written to the change log (changes.py) in
+the transaction that changes them, whichever worker or process commits.
+Each worker runs one ``EventHub``: a single poller thread reads new entries
+(woken at once by commits in the same worker, otherwise every
+``ADMIN_EVENTS_POLL_SECONDS``), recounts the dashboard cards of the watched
+properties they touch and queues the events for every connected dashboard.
+Connected dashboards only wait on their own queue, so an open stream holds a
+request thread but never a database connection.
+
+Event ids are change log cursors, valid on any worker. A browser that
+reconnects sends ``Last-Event-ID`` and gets what it missed, from the hub's
+recent events or else from the log. A dashboard that falls more than
+``ADMIN_EVENTS_BUFFER`` events behind is disconnected and resumes the same
+way; one more than ``CATCH_UP_LIMIT`` entries behind gets ``reset`` and
+reloads the page.
+
+    event: booking | contact   data: {"operation", "id", "data"}
+    event: stats               data: {"counts", "delta"}
+    event: reset               data: {}
+"""
+import threading
+from collections import deque, namedtuple
+
+from flask import Response
+from sqlalchemy import func, select
+
+from models import db, Booking, Contact, Room, User
+from changes import change_signal, committed_head, format_cursor, read_entries
+from serializers import dumps
+from tenancy import property_scope
+
+LIVE_ENTITIES = ('booking', 'contact')
+
+# Log entries read per query by the poller, and at most replayed on reconnect
+PAGE_SIZE = 500
+CATCH_UP_LIMIT = 500
+
+# Browsers reconnect this many milliseconds after a stream ends
+RETRY_MS = 2000
+
+# position is the change log (txid, id), None for stats
+Event = namedtuple('Event', 'position property_id name data')
+
+
+def dashboard_stats():
+    """Counts shown on the dashboard cards for the selected property"""
+    return {
+        'total_bookings': db.session.scalar(select(func.count(Booking.id))),
+        'pending_bookings': db.session.scalar(select(func.count(Booking.id)).where(Booking.status == 'pending')),
+        'new_contacts': db.session.scalar(select(func.count(Contact.id)).where(Contact.status == 'new')),
+        'total_users': db.session.scalar(select(func.count(User.id))),
+    }
+
+
+def change_events(entries):
+    """Events for change log entries, with room names added to bookings"""
+    room_ids = {entry.data['room_id'] for entry in entries if entry.entity == 'booking' and entry.data}
+    room_names = dict(db.session.execute(select(Room.id, Room.name).where(Room.id.in_(room_ids))).all()) if room_ids else {}
+
+    events = []
+    for entry in entries:
+        data = entry.data
+        if entry.entity == 'booking' and data:
+            data = dict(data, room_name=room_names.get(data['room_id']))
+        events.append(Event((entry.txid, entry.id), entry.property_id, entry.entity, {
+            'operation': entry.operation,
+            'id': entry.entity_id,
+            'data': data
+        }))
+    return events
+
+
+def format_event(event):
+    """One event in text/event-stream framing"""
+    lines = [f'id: {format_cursor(*event.position)}'] if event.position is not None else []
+    lines.append(f'event: {event.name}')
+    lines.append(f"data: {dumps(event.data).decode('utf-8')}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscriber:
+    """One connected dashboard: a bounded queue of events for one property"""
+
+    def __init__(self, property_id, size):
+        self.property_id = property_id
+        self.size = size
+        self.overflowed = False
+        self._events = deque()
+        self._condition = threading.Condition()
+
+    def put(self, event):
+        with self._condition:
+            if self.overflowed:
+                return
+            if len(self._events) >= self.size:
+                # Too far behind; the browser reconnects and resumes from its last event id
+                self._events.clear()
+                self.overflowed = True
+            else:
+                self._events.append(event)
+            self._condition.notify()
+
+    def get(self, timeout):
+        """Queued events, waiting up to `timeout` seconds for one; None once overflowed"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._events or self.overflowed, timeout)
+            if self.overflowed:
+                return None
+            events = list(self._events)
+            self._events.clear()
+            return events
+
+
+class EventHub:
+    """Fans change log entries out to the dashboards connected to this process"""
+
+    def __init__(self, app, buffer_size=100, history=1000, heartbeat=15.0, poll_interval=1.0, max_streams=3):
+        self.app = app
+        self.buffer_size = buffer_size
+        self.max_streams = max_streams
+        self.heartbeat = heartbeat
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._recent = deque(maxlen=history)
+        self._floor = None      # recent events cover everything after this position
+        self._position = None   # last position read from the log
+        self._stats = {}        # property id -> counts last sent
+        self._thread = None
+
+    def subscribe(self, property_id):
+        """Register a dashboard; returns it with the hub's recent events and their floor, or None when full"""
+        subscriber = Subscriber(property_id, self.buffer_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_streams:
+                return None
+            if self._thread is None:
+                # Idle until now: follow the log from here on
+                self._position = self._floor = committed_head()
+                self._recent.clear()
+                self._stats.clear()
+                self._thread = threading.Thread(target=self._run, name='admin-events', daemon=True)
+                self._thread.start()
+            self._subscribers.add(subscriber)
+            recent = [event for event in self._recent if event.property_id == property_id]
+            return subscriber, recent, self._floor
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                generation = change_signal.generation
+                with self._lock:
+                    if not self._subscribers:
+                        self._thread = None
+                        return
+                try:
+                    self._poll()
+                except Exception as e:
+                    print(f"Admin events poll failed: {e}")
+                finally:
+                    # Give the connection back between polls
+                    db.session.remove()
+                change_signal.wait(generation, self.poll_interval)
+
+    def _poll(self):
+        while True:
+            entries = read_entries(self._position, PAGE_SIZE, LIVE_ENTITIES)
+            if entries:
+                self._publish(entries[:PAGE_SIZE])
+            if len(entries) <= PAGE_SIZE:
+                return
+
+    def _publish(self, entries):
+        events = change_events(entries)
+        with self._lock:
+            watched = {subscriber.property_id for subscriber in self._subscribers}
+        for property_id in sorted({entry.property_id for entry in entries} & watched):
+            with property_scope(property_id):
+                counts = dashboard_stats()
+            previous = self._stats.get(property_id)
+            self._stats[property_id] = counts
+            if counts != previous:
+                delta = {key: counts[key] - previous[key] for key in counts} if previous else None
+                events.append(Event(None, property_id, 'stats', {'counts': counts, 'delta': delta}))
+
+        with self._lock:
+            for event in events:
+                if event.position is None:
+                    continue
+                if len(self._recent) == self._recent.maxlen:
+                    self._floor = self._recent[0].position
+                self._recent.append(event)
+            self._position = (entries[-1].txid, entries[-1].id)
+            for subscriber in self._subscribers:
+                for event in events:
+                    if event.property_id == subscriber.property_id:
+                        subscriber.put(event)
+
+    def stream(self, property_id, position=None):
+        """Streaming response for one dashboard that has seen everything up to `position`
+
+        Runs in the request (app context, property selected); the returned
+        generator touches neither, so the request's connection is released
+        before streaming starts. Returns None when this process already
+        streams to `max_streams` dashboards.
+        """
+        subscribed = self.subscribe(property_id)
+        if subscribed is None:
+            return None
+        subscriber, recent, floor = subscribed
+        if position is None:
+            position = floor
+        counts = dashboard_stats()
+        # Lets the poller send the first change to these counts as a delta
+        self._stats.setdefault(property_id, counts)
+        backlog = [Event(None, property_id, 'stats', {'counts': counts, 'delta': None})]
+        if position < floor:
+            entries = read_entries(position, CATCH_UP_LIMIT, LIVE_ENTITIES)
+            if len(entries) > CATCH_UP_LIMIT:
+                self.unsubscribe(subscriber)
+                return self._response([format_event(Event(None, property_id, 'reset', {}))])
+            backlog += change_events(entries)
+        backlog += recent
+
+        def generate(last=position):
+            yield f'retry: {RETRY_MS}\n\n'
+            events = backlog
+            while events is not None:
+                for event in events:
+                    if event.position is not None:
+                        # Recent and caught-up events overlap with what the poller delivers
+                        if event.position <= last:
+                            continue
+                        last = event.position
+                    yield format_event(event)
+                events = subscriber.get(self.heartbeat)
+                if events == []:
+                    yield ': heartbeat\n\n'
+
+        response = self._response(generate())
+        # Also runs when the client is gone before the first event is written
+        response.call_on_close(lambda: self.unsubscribe(subscriber))
+        return response
+
+    def _response(self, body):
+        return Response(body, mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            # Stop nginx-style proxies from buffering the stream
+            'X-Accel-Buffering': 'no'
+        })
+
+
+def init_live(app):
+    """Register this process's event hub for /admin/events"""
+    app.extensions['live'] = EventHub(
+        app,
+        buffer_size=app.config.get('ADMIN_EVENTS_BUFFER', 100),
+        heartbeat=app.config.get('ADMIN_EVENTS_HEARTBEAT', 15),
+        poll_interval=app.config.get('ADMIN_EVENTS_POLL_SECONDS', 1),
+        max_streams=app.config.get('ADMIN_EVENTS_MAX_STREAMS', 3)
+    )
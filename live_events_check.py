@@ -0,0 +1,269 @@
+"""Check: follow /admin/events like the dashboard and compare with the tables
+
+    python live_events_check.py [operations]
+
+Serves the app from a threaded server (like gunicorn's gthread worker) on a
+throwaway SQLite database, with a small per-client buffer and a short
+heartbeat. One dashboard per property follows ``/admin/events`` the way a
+browser's EventSource does, reconnecting with ``Last-Event-ID`` whenever
+the stream ends. Meanwhile random guest bookings, contact messages, status
+changes, deletes and batch operations run across both properties; one
+dashboard is disconnected for a while and large batches overflow the
+buffer. At the end each dashboard's bookings, messages and stats cards must
+equal the tables, and no database connection may be checked out while the
+streams sit idle. Exits with status 1 on any difference.
+"""
+import http.client
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+DATABASE = os.path.join(tempfile.mkdtemp(), 'live.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DATABASE}'
+os.environ.pop('DATABASE_REPLICA_URL', None)
+os.environ['MAIL_SERVER'] = 'localhost'
+os.environ['MAIL_PORT'] = '1'
+os.environ['ADMIN_EVENTS_BUFFER'] = '8'
+os.environ['ADMIN_EVENTS_HEARTBEAT'] = '0.5'
+
+from sqlalchemy import select
+from werkzeug.serving import make_server
+
+from app import app, db
+from live import dashboard_stats
+from models import Booking, Contact, Room
+from serializers import BookingSchema, ContactSchema
+from tenancy import property_scope
+
+PROPERTIES = ('default', 'lakeside')
+
+
+class Dashboard(threading.Thread):
+    """Follows /admin/events for one property and keeps what an open page would show"""
+
+    def __init__(self, port, cookie, slug):
+        super().__init__(daemon=True)
+        self.port = port
+        self.cookie = cookie
+        self.slug = slug
+        self.rows = {'booking': {}, 'contact': {}}
+        self.stats = None
+        self.last_event_id = None
+        self.connections = 0
+        self.heartbeats = 0
+        self.received = time.monotonic()
+        self.paused = threading.Event()
+        self._socket = None
+
+    def run(self):
+        while True:
+            if self.paused.is_set():
+                time.sleep(0.05)
+                continue
+            try:
+                self.follow()
+            except (OSError, http.client.HTTPException):
+                pass
+            time.sleep(0.05)
+
+    def disconnect(self):
+        self.paused.set()
+        if self._socket is not None:
+            self._socket.shutdown(socket.SHUT_RDWR)
+
+    def follow(self):
+        headers = {'Cookie': self.cookie, 'Accept': 'text/event-stream'}
+        if self.last_event_id:
+            headers['Last-Event-ID'] = self.last_event_id
+        connection = http.client.HTTPConnection('127.0.0.1', self.port)
+        connection.request('GET', f'/admin/events?property={self.slug}', headers=headers)
+        self._socket = connection.sock
+        response = connection.getresponse()
+        assert response.status == 200, response.read()
+        self.connections += 1
+
+        fields = {}
+        while not self.paused.is_set():
+            line = response.readline()
+            if not line:
+                return
+            line = line.decode('utf-8').rstrip('\n')
+            if line.startswith(':'):
+                self.heartbeats += 1
+            elif line:
+                name, _, value = line.partition(': ')
+                fields[name] = value
+            elif fields:
+                self.dispatch(fields)
+                fields = {}
+
+    def dispatch(self, fields):
+        self.received = time.monotonic()
+        if 'id' in fields:
+            self.last_event_id = fields['id']
+        data = json.loads(fields.get('data', '{}'))
+        event = fields.get('event')
+        if event == 'stats':
+            self.stats = data['counts']
+        elif event in self.rows:
+            if data['operation'] == 'delete':
+                self.rows[event].pop(data['id'], None)
+            else:
+                self.rows[event][data['id']] = data['data']
+        elif event == 'reset':
+            raise AssertionError(f'{self.slug}: unexpected reset')
+
+
+def booking_payload(rng, room_id):
+    check_in = date.today() + timedelta(days=rng.randint(1, 200))
+    return {
+        'room_id': room_id,
+        'guest_name': rng.choice(['Ann Lee', 'Chen Wei', 'Mia <b>Lin</b>']),
+        'guest_email': 'ann@example.com',
+        'guest_phone': '0912345678',
+        'check_in': check_in.isoformat(),
+        'check_out': (check_in + timedelta(days=rng.randint(1, 4))).isoformat(),
+        'num_guests': 1,
+    }
+
+
+def contact_payload(rng):
+    return {
+        'name': 'Ann Lee',
+        'email': 'ann@example.com',
+        'phone': '0912345678',
+        'subject': rng.choice(['', 'Late check-in']),
+        'message': 'Is the room available next weekend?',
+    }
+
+
+def existing(slug):
+    with app.app_context(), property_scope(PROPERTIES.index(slug) + 1):
+        rooms = db.session.scalars(select(Room.id)).all()
+        bookings = db.session.scalars(select(Booking.id)).all()
+        contacts = db.session.scalars(select(Contact.id)).all()
+    return rooms, bookings, contacts
+
+
+def operate(client, rng, large=False):
+    slug = rng.choice(PROPERTIES)
+    rooms, bookings, contacts = existing(slug)
+    action = rng.choice(['booking', 'booking', 'contact', 'contact', 'booking_status', 'contact_status',
+                         'delete_booking', 'delete_contact', 'batch_status', 'batch_delete'])
+    size = 20 if large else 3
+
+    if action == 'booking' or not bookings:
+        client.post(f'/api/booking?property={slug}', json=booking_payload(rng, rng.choice(rooms)))
+    elif action == 'contact' or not contacts:
+        client.post(f'/api/contact?property={slug}', json=contact_payload(rng))
+    elif action == 'booking_status':
+        client.post(f'/admin/booking/{rng.choice(bookings)}/status?property={slug}',
+                    json={'status': rng.choice(['pending', 'confirmed', 'cancelled'])})
+    elif action == 'contact_status':
+        client.post(f'/admin/contact/{rng.choice(contacts)}/status?property={slug}',
+                    json={'status': rng.choice(['read', 'replied'])})
+    elif action == 'delete_booking':
+        client.delete(f'/admin/booking/{rng.choice(bookings)}?property={slug}')
+    elif action == 'delete_contact':
+        client.delete(f'/admin/contact/{rng.choice(contacts)}?property={slug}')
+    elif action == 'batch_status':
+        resource, ids, status = rng.choice([
+            ('booking', bookings, rng.choice(['pending', 'confirmed'])),
+            ('contact', contacts, rng.choice(['new', 'read'])),
+        ])
+        client.post(f'/admin/batch?property={slug}', json={'operations': [{
+            'resource': resource, 'action': 'set_status', 'status': status,
+            'ids': rng.sample(ids, min(len(ids), size))
+        }]})
+    else:
+        resource, ids = rng.choice([('booking', bookings), ('contact', contacts)])
+        client.post(f'/admin/batch?property={slug}', json={'operations': [{
+            'resource': resource, 'action': 'delete', 'ids': rng.sample(ids, min(len(ids), size // 3 or 1))
+        }]})
+
+
+def settle(dashboards, quiet=1.5, timeout=30):
+    """Wait until no dashboard has received an event for `quiet` seconds"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if all(time.monotonic() - dashboard.received > quiet for dashboard in dashboards):
+            return
+        time.sleep(0.1)
+
+
+def differences(dashboard, index):
+    count = 0
+    with app.app_context(), property_scope(index):
+        expected = {
+            'booking': {row[0]: BookingSchema().dump_row(row) for row in db.session.execute(BookingSchema().select())},
+            'contact': {row[0]: ContactSchema().dump_row(row) for row in db.session.execute(ContactSchema().select())},
+        }
+        stats = dashboard_stats()
+    for entity, rows in expected.items():
+        shown = {entity_id: {key: value for key, value in data.items() if key != 'room_name'}
+                 for entity_id, data in dashboard.rows[entity].items()}
+        for entity_id in sorted(set(rows) | set(shown)):
+            if rows.get(entity_id) != shown.get(entity_id):
+                count += 1
+                print(f"  {dashboard.slug}: {entity} {entity_id}\n    table:     {rows.get(entity_id)!r}"
+                      f"\n    dashboard: {shown.get(entity_id)!r}")
+    if dashboard.stats != stats:
+        count += 1
+        print(f"  {dashboard.slug}: stats {dashboard.stats} != {stats}")
+    return count
+
+
+def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    rng = random.Random(11)
+    app.config['WTF_CSRF_ENABLED'] = False
+    client = app.test_client()
+
+    client.get('/init-db')
+    response = client.post('/login', json={'email': 'admin@gangcheng.com', 'password': 'admin123'})
+    client.post('/admin/property', json={'slug': 'lakeside', 'name': 'Lakeside'})
+    client.post('/admin/room?property=lakeside', json={
+        'name': 'Lake Room', 'room_type': 'Double', 'description': 'Quiet room',
+        'price_per_night': 3200, 'max_guests': 2, 'is_available': True
+    })
+    cookie = response.headers['Set-Cookie'].split(';')[0]
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    dashboards = [Dashboard(server.server_port, cookie, slug) for slug in PROPERTIES]
+    for dashboard in dashboards:
+        dashboard.start()
+    time.sleep(1)
+
+    with app.app_context():
+        idle = db.engine.pool.checkedout()
+    print(f"connections checked out with {len(dashboards)} open streams: {idle}")
+
+    for step in range(operations):
+        if step == operations // 3:
+            dashboards[0].disconnect()
+        if step == operations // 2:
+            dashboards[0].paused.clear()
+        operate(client, rng, large=step % 50 == 49)
+        if rng.random() < 0.1:
+            time.sleep(0.05)
+
+    settle(dashboards)
+    failures = 1 if idle else 0
+    for index, dashboard in enumerate(dashboards, start=1):
+        failures += differences(dashboard, index)
+        print(f"{dashboard.slug:<10} {len(dashboard.rows['booking'])} bookings, {len(dashboard.rows['contact'])} messages, "
+              f"{dashboard.connections} connections, {dashboard.heartbeats} heartbeats")
+    print(f"{failures} differences")
+    server.shutdown()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
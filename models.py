@@ -1,9 +1,37 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
+from sqlalchemy.orm import declared_attr
 from werkzeug.security import generate_password_hash, check_password_hash
 
-db = SQLAlchemy()
+from db_routing import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+BOOKING_STATUSES = ('pending', 'confirmed', 'cancelled', 'completed')
+CONTACT_STATUSES = ('new', 'read', 'replied')
+
+
+class Property(db.Model):
+    """A B&B operated from this deployment"""
+    __tablename__ = 'properties'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    slug = db.Column(db.String(50), unique=True, nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    domain = db.Column(db.String(255), unique=True)  # Host name that selects this property
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<Property {self.slug}>'
+
+
+class PropertyScoped:
+    """Rows owned by one property; tenancy.py scopes queries and stamps new rows"""
+    
+    @declared_attr
+    def property_id(cls):
+        return db.Column(db.Integer, db.ForeignKey('properties.id'), nullable=False)
 
 
 class User(UserMixin, db.Model):
@@ -32,9 +60,12 @@ class User(UserMixin, db.Model):
         return f'<User {self.username}>'
 
 
-class Room(db.Model):
+class Room(PropertyScoped, db.Model):
     """Room model for accommodations"""
     __tablename__ = 'rooms'
+    __table_args__ = (
+        db.Index('ix_rooms_property_available', 'property_id', 'is_available'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -51,28 +82,18 @@ class Room(db.Model):
     # Relationships
     bookings = db.relationship('Booking', backref='room', lazy=True)
     
-    def to_dict(self):
-        """Convert room to dictionary"""
-        return {
-            'id': self.id,
-            'name': self.name,
-            'room_type': self.room_type,
-            'description': self.description,
-            'image_url': self.image_url or '',
-            'price_per_night': self.price_per_night,
-            'max_guests': self.max_guests,
-            'amenities': self.amenities or '',
-            'is_available': self.is_available,
-            'is_featured': self.is_featured
-        }
-    
     def __repr__(self):
         return f'<Room {self.name}>'
 
 
-class Booking(db.Model):
+class Booking(PropertyScoped, db.Model):
     """Booking model for reservations"""
     __tablename__ = 'bookings'
+    __table_args__ = (
+        db.Index('ix_bookings_property_created', 'property_id', 'created_at'),
+        db.Index('ix_bookings_property_status', 'property_id', 'status'),
+        db.Index('ix_bookings_property_check_in', 'property_id', 'check_in'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)  # Allow guest bookings
@@ -101,9 +122,13 @@ class Booking(db.Model):
         return f'<Booking {self.id} - {self.guest_name}>'
 
 
-class Contact(db.Model):
+class Contact(PropertyScoped, db.Model):
     """Contact form submissions"""
     __tablename__ = 'contacts'
+    __table_args__ = (
+        db.Index('ix_contacts_property_created', 'property_id', 'created_at'),
+        db.Index('ix_contacts_property_status', 'property_id', 'status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -118,3 +143,50 @@ class Contact(db.Model):
     
     def __repr__(self):
         return f'<Contact {self.name} - {self.email}>'
+
+
+class BookingDailyStat(PropertyScoped, db.Model):
+    """Per-room, per-day booking aggregates (maintained by rollups.py)"""
+    __tablename__ = 'booking_daily_stats'
+    __table_args__ = (
+        db.Index('ix_booking_daily_stats_property_day', 'property_id', 'day'),
+    )
+    
+    room_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, primary_key=True, index=True)
+    
+    # Stay nights and revenue on this day from bookings that are not cancelled
+    nights_sold = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    
+    # Bookings arriving on this day, by status, and their summed lead time
+    arrivals = db.Column(db.Integer, nullable=False, default=0)
+    arrivals_pending = db.Column(db.Integer, nullable=False, default=0)
+    arrivals_confirmed = db.Column(db.Integer, nullable=False, default=0)
+    arrivals_cancelled = db.Column(db.Integer, nullable=False, default=0)
+    arrivals_completed = db.Column(db.Integer, nullable=False, default=0)
+    lead_time_days = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<BookingDailyStat room={self.room_id} {self.day}>'
+
+
+class ChangeLog(PropertyScoped, db.Model):
+    """Row-level change feed for rooms and bookings (written by changes.py)"""
+    __tablename__ = 'change_log'
+    __table_args__ = (
+        db.Index('ix_change_log_property_position', 'property_id', 'txid', 'id'),
+        db.Index('ix_change_log_entity', 'entity', 'entity_id'),
+    )
+    
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    # Writing transaction on PostgreSQL (0 elsewhere); feed order is (txid, id)
+    txid = db.Column(db.BigInteger, nullable=False, default=0)
+    entity = db.Column(db.String(20), nullable=False)  # room, booking
+    entity_id = db.Column(db.Integer, nullable=False)
+    operation = db.Column(db.String(10), nullable=False)  # insert, update, delete
+    data = db.Column(db.JSON)  # Row after the change; NULL for deletes
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ChangeLog {self.operation} {self.entity} {self.entity_id}>'
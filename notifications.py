@@ -0,0 +1,70 @@
+"""Email notifications for contact messages and bookings
+
+Flask-Mail is only needed when sending, so it is imported and initialized on
+first use. Sending failures are logged and never break the request.
+"""
+from flask import current_app
+
+
+def get_mail():
+    """Return the Flask-Mail state, initializing the extension on first use"""
+    if 'mail' not in current_app.extensions:
+        from flask_mail import Mail
+        Mail(current_app)
+    return current_app.extensions['mail']
+
+
+def send_email(subject, recipients, body, reply_to=None):
+    """Send an email; failures are logged and never break the request"""
+    try:
+        from flask_mail import Message
+        mail = get_mail()  # Message() reads the default sender from the extension
+        msg = Message(subject=subject, recipients=recipients, reply_to=reply_to)
+        msg.body = body
+        mail.send(msg)
+    except Exception as e:
+        print(f"Email sending failed: {e}")
+
+
+def send_contact_notification(name, email, phone, subject, message):
+    """Forward a contact form submission to the B&B inbox"""
+    send_email(
+        subject=f"Contact Form: {subject or 'New Message'}",
+        recipients=[current_app.config['MAIL_DEFAULT_SENDER']],
+        reply_to=email,
+        body=f"""
+New contact form submission:
+
+Name: {name}
+Email: {email}
+Phone: {phone or 'Not provided'}
+
+Message:
+{message}
+            """
+    )
+
+
+def send_booking_confirmation(guest_name, guest_email, room_name, check_in, check_out, num_guests, total_price):
+    """Email the guest a summary of their booking request"""
+    send_email(
+        subject=f"Booking Confirmation - {room_name}",
+        recipients=[guest_email],
+        body=f"""
+Dear {guest_name},
+
+Thank you for your booking request at Gancheng B&B!
+
+Booking Details:
+- Room: {room_name}
+- Check-in: {check_in.strftime('%B %d, %Y')}
+- Check-out: {check_out.strftime('%B %d, %Y')}
+- Guests: {num_guests}
+- Total: NT$ {total_price:,.0f}
+
+Your booking is currently pending confirmation. We will contact you shortly to confirm availability.
+
+Best regards,
+Gancheng B&B Team
+            """
+    )
@@ -0,0 +1,84 @@
+"""Startup profile: import-time breakdown and time-to-first-response
+
+    python profile_startup.py
+
+Prints which packages dominate `import app`, then starts fresh interpreters
+against a throwaway SQLite database and times the first request to each
+warm-up path, once cold and once after warm_up().
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+FIRST_RESPONSE_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from app import app
+from warmup import warm_up
+imported = time.perf_counter() - start
+warmed = None
+if sys.argv[1] == 'warm':
+    start = time.perf_counter()
+    warm_up(app)
+    warmed = time.perf_counter() - start
+client = app.test_client()
+first = {}
+for path in app.config['WARMUP_PATHS']:
+    start = time.perf_counter()
+    client.get(path)
+    first[path] = time.perf_counter() - start
+print(json.dumps({'import': imported, 'warm_up': warmed, 'first': first}))
+"""
+
+
+def import_breakdown(limit=12):
+    """Self time of `import app` grouped by top-level package"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=HERE, capture_output=True, text=True, check=True
+    )
+    totals = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        totals[name.strip().split('.')[0]] += int(self_us)
+
+    grand_total = sum(totals.values())
+    print(f"Import time for app.py: {grand_total / 1000:.1f} ms")
+    for package, micros in sorted(totals.items(), key=lambda item: -item[1])[:limit]:
+        print(f"  {package:<24} {micros / 1000:>8.1f} ms  {micros / grand_total:>6.1%}")
+
+
+def first_response(env, mode):
+    result = subprocess.run(
+        [sys.executable, '-c', FIRST_RESPONSE_SCRIPT, mode],
+        cwd=HERE, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def time_to_first_response():
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'profile.db')}")
+        env.pop('DATABASE_REPLICA_URL', None)
+        subprocess.run([sys.executable, 'init_db.py'], cwd=HERE, env=env, capture_output=True, check=True)
+
+        cold = first_response(env, 'cold')
+        warm = first_response(env, 'warm')
+
+    print(f"\nTime to first response (import {cold['import'] * 1000:.0f} ms, "
+          f"warm-up {warm['warm_up'] * 1000:.0f} ms)")
+    print(f"  {'path':<16} {'cold':>10} {'warmed':>10}")
+    for path in cold['first']:
+        print(f"  {path:<16} {cold['first'][path] * 1000:>8.1f}ms {warm['first'][path] * 1000:>8.1f}ms")
+
+
+if __name__ == '__main__':
+    import_breakdown()
+    time_to_first_response()
@@ -0,0 +1,375 @@
+"""Daily per-room booking rollups for admin reporting
+
+``booking_daily_stats`` keeps one row per room and day (tagged with the
+room's property, so reports are scoped like every other query):
+
+* ``nights_sold`` / ``revenue``: stay nights on that day from bookings that
+  are not cancelled, with each booking's ``total_price`` spread evenly over
+  its nights
+* ``arrivals`` / ``arrivals_<status>``: bookings checking in that day
+* ``lead_time_days``: summed days between booking and check-in for arrivals
+
+Rows are kept up to date in the same transaction as every booking write:
+ORM inserts, updates and deletes through session flush hooks, and bulk
+statements from batch.py through ``apply_bulk_booking_change``.
+Reports then aggregate a few thousand rollup rows instead of scanning
+``bookings``.
+
+    python rollups.py backfill      # rebuild from the bookings table
+    python rollups.py check [--fix] # compare with the bookings table
+"""
+import calendar
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, func, inspect, select, text
+
+from models import db, Booking, BookingDailyStat, Room, BOOKING_STATUSES
+
+METRICS = ['nights_sold', 'revenue', 'arrivals'] + [f'arrivals_{status}' for status in BOOKING_STATUSES] + ['lead_time_days']
+
+# Booking columns the rollups are derived from
+SOURCE_COLUMNS = ('property_id', 'room_id', 'check_in', 'check_out', 'status', 'total_price', 'created_at')
+
+REPORT_GROUPS = ('day', 'month', 'year', 'room')
+
+# PostgreSQL formats the date; SQLite stores dates as ISO text, so a prefix is enough
+PERIOD_FORMATS = {'day': 'YYYY-MM-DD', 'month': 'YYYY-MM', 'year': 'YYYY'}
+PERIOD_LENGTHS = {'day': 10, 'month': 7, 'year': 4}
+
+REVENUE_TOLERANCE = 0.01
+
+
+# Contributions
+
+def booking_contribution(booking, sign=1):
+    """Rollup deltas for one booking as {(property_id, room_id, day): {metric: delta}}"""
+    deltas = defaultdict(lambda: defaultdict(float))
+    room_id, check_in, check_out = booking['room_id'], booking['check_in'], booking['check_out']
+    if room_id is None or check_in is None or check_out is None:
+        return deltas
+
+    room = (booking['property_id'], room_id)
+    arrival = deltas[room + (check_in,)]
+    arrival['arrivals'] += sign
+    if booking['status'] in BOOKING_STATUSES:
+        arrival[f"arrivals_{booking['status']}"] += sign
+    created = (booking['created_at'] or datetime.utcnow()).date()
+    arrival['lead_time_days'] += sign * max((check_in - created).days, 0)
+
+    nights = (check_out - check_in).days
+    if booking['status'] != 'cancelled' and nights > 0:
+        nightly = (booking['total_price'] or 0) / nights
+        for offset in range(nights):
+            day = deltas[room + (check_in + timedelta(days=offset),)]
+            day['nights_sold'] += sign
+            day['revenue'] += sign * nightly
+    return deltas
+
+
+def _merge(total, deltas):
+    for key, metrics in deltas.items():
+        for metric, value in metrics.items():
+            total[key][metric] += value
+
+
+def _rows(deltas):
+    """Rollup rows (with int counters) for the non-zero deltas"""
+    rows = []
+    for (property_id, room_id, day), metrics in deltas.items():
+        if not any(metrics.values()):
+            continue
+        row = {'property_id': property_id, 'room_id': room_id, 'day': day}
+        for metric in METRICS:
+            value = metrics.get(metric, 0)
+            row[metric] = value if metric == 'revenue' else int(round(value))
+        rows.append(row)
+    return rows
+
+
+def apply_deltas(connection, deltas):
+    """Add deltas to the rollup table with one upsert statement"""
+    rows = _rows(deltas)
+    if not rows:
+        return
+
+    table = BookingDailyStat.__table__
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        insert = None
+
+    if insert is not None:
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=['room_id', 'day'],
+            set_={metric: table.c[metric] + statement.excluded[metric] for metric in METRICS}
+        )
+        connection.execute(statement, rows)
+        return
+
+    # Other databases: update existing rows, insert the rest
+    for row in rows:
+        result = connection.execute(
+            table.update()
+            .where(table.c.room_id == row['room_id'], table.c.day == row['day'])
+            .values({metric: table.c[metric] + row[metric] for metric in METRICS})
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(**row))
+
+
+# Keeping rollups in sync with booking writes
+
+def _current(booking):
+    return {column: getattr(booking, column) for column in SOURCE_COLUMNS}
+
+
+def _changed_bookings(session):
+    """Persistent bookings this flush updates (in rollup columns) and deletes"""
+    updated = [
+        obj for obj in session.dirty
+        if isinstance(obj, Booking) and any(inspect(obj).attrs[column].history.has_changes() for column in SOURCE_COLUMNS)
+    ]
+    deleted = [obj for obj in session.deleted if isinstance(obj, Booking)]
+    return updated, deleted
+
+
+def _read_old_bookings(session, flush_context, instances):
+    """Read the stored rows of the bookings this flush changes, before it writes them
+
+    Attribute history has no old value for a booking that was expired (by a
+    commit) before it was changed, so the "before" side comes from the table.
+    """
+    updated, deleted = _changed_bookings(session)
+    ids = [inspect(obj).identity[0] for obj in updated + deleted]
+    if not ids:
+        return
+    columns = [getattr(Booking, column) for column in SOURCE_COLUMNS]
+    rows = session.execute(
+        select(Booking.id, *columns).where(Booking.id.in_(ids)).execution_options(all_properties=True)
+    ).mappings()
+    session.info['old_bookings'] = {row['id']: row for row in rows}
+
+
+def _track_booking_writes(session, flush_context):
+    """Apply rollup deltas for the bookings written by this flush"""
+    deltas = defaultdict(lambda: defaultdict(float))
+    old_bookings = session.info.pop('old_bookings', {})
+    updated, deleted = _changed_bookings(session)
+
+    for obj in session.new:
+        if isinstance(obj, Booking):
+            _merge(deltas, booking_contribution(_current(obj)))
+
+    for obj in updated + deleted:
+        old = old_bookings.get(inspect(obj).identity[0])
+        if old is not None:
+            _merge(deltas, booking_contribution(old, sign=-1))
+
+    for obj in updated:
+        _merge(deltas, booking_contribution(_current(obj)))
+
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+# Registered by create_app() (see db_routing.init_session_hooks)
+ROLLUP_HOOKS = [
+    ('before_flush', _read_old_bookings),
+    ('after_flush', _track_booking_writes),
+]
+
+
+def apply_bulk_booking_change(ids, values=None):
+    """Update rollups before a bulk UPDATE (values) or DELETE (values=None) of bookings"""
+    columns = [getattr(Booking, column) for column in SOURCE_COLUMNS]
+    deltas = defaultdict(lambda: defaultdict(float))
+    for row in db.session.execute(select(*columns).where(Booking.id.in_(ids))).mappings():
+        _merge(deltas, booking_contribution(row, sign=-1))
+        if values is not None:
+            _merge(deltas, booking_contribution({**row, **values}))
+    apply_deltas(db.session.connection(), deltas)
+
+
+# Backfill and consistency check
+
+def compute_rollups():
+    """Rollups recomputed from the bookings table"""
+    columns = [getattr(Booking, column) for column in SOURCE_COLUMNS]
+    deltas = defaultdict(lambda: defaultdict(float))
+    result = db.session.execute(select(*columns).execution_options(yield_per=5000))
+    for row in result.mappings():
+        _merge(deltas, booking_contribution(row))
+    return deltas
+
+
+def backfill():
+    """Rebuild the rollup table from the bookings table; returns the row count"""
+    if db.session.connection().dialect.name == 'postgresql':
+        # Hold off booking writes so none are counted twice or missed
+        db.session.execute(text('LOCK TABLE bookings IN SHARE MODE'))
+    db.session.execute(delete(BookingDailyStat))
+    rows = _rows(compute_rollups())
+    if rows:
+        db.session.execute(BookingDailyStat.__table__.insert(), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def check_rollups():
+    """Differences between stored rollups and the bookings table"""
+    expected = compute_rollups()
+    stored = {
+        (row.property_id, row.room_id, row.day): row
+        for row in db.session.execute(select(BookingDailyStat)).scalars()
+    }
+
+    mismatches = []
+    for key in sorted(set(expected) | set(stored)):
+        for metric in METRICS:
+            want = expected[key].get(metric, 0) if key in expected else 0
+            have = getattr(stored[key], metric) if key in stored else 0
+            tolerance = REVENUE_TOLERANCE if metric == 'revenue' else 0
+            if abs(want - have) > tolerance:
+                mismatches.append({
+                    'property_id': key[0],
+                    'room_id': key[1],
+                    'day': key[2].isoformat(),
+                    'metric': metric,
+                    'expected': round(want, 2),
+                    'stored': round(have, 2)
+                })
+    return mismatches
+
+
+# Reports
+
+def _parse_date(value, default):
+    if not value:
+        return default
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'Invalid date: {value} (expected YYYY-MM-DD)')
+
+
+def _period_bounds(label, group_by):
+    """First day and day after the last day of a period label"""
+    if group_by == 'day':
+        start = date.fromisoformat(label)
+        return start, start + timedelta(days=1)
+    if group_by == 'month':
+        year, month = map(int, label.split('-'))
+        return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1]) + timedelta(days=1)
+    year = int(label)
+    return date(year, 1, 1), date(year + 1, 1, 1)
+
+
+def _summarize(totals, room_nights):
+    nights = int(totals['nights_sold'] or 0)
+    revenue = float(totals['revenue'] or 0)
+    arrivals = int(totals['arrivals'] or 0)
+    return {
+        'nights_sold': nights,
+        'revenue': round(revenue, 2),
+        'occupancy': round(nights / room_nights, 4) if room_nights else None,
+        'average_daily_rate': round(revenue / nights, 2) if nights else None,
+        'bookings': dict(
+            {'total': arrivals},
+            **{status: int(totals[f'arrivals_{status}'] or 0) for status in BOOKING_STATUSES}
+        ),
+        'average_lead_time_days': round(totals['lead_time_days'] / arrivals, 1) if arrivals else None
+    }
+
+
+def build_report(start=None, end=None, group_by='month', room_id=None):
+    """Revenue, occupancy and booking counts between two dates (inclusive)"""
+    today = date.today()
+    start = _parse_date(start, today.replace(month=1, day=1))
+    end = _parse_date(end, today)
+    if start > end:
+        raise ValueError('from must not be after to')
+    if group_by not in REPORT_GROUPS:
+        raise ValueError(f"group_by must be one of: {', '.join(REPORT_GROUPS)}")
+
+    # ORM attributes (not table columns) so the query is scoped to the selected property
+    stat = BookingDailyStat
+    sums = [func.sum(getattr(stat, metric)).label(metric) for metric in METRICS]
+    conditions = [stat.day >= start, stat.day <= end]
+    if room_id is not None:
+        conditions.append(stat.room_id == room_id)
+
+    if group_by == 'room':
+        key = stat.room_id
+    else:
+        if db.session.get_bind().dialect.name == 'postgresql':
+            key = func.to_char(stat.day, PERIOD_FORMATS[group_by])
+        else:
+            key = func.substr(stat.day, 1, PERIOD_LENGTHS[group_by])
+
+    statement = select(key.label('key'), *sums).where(*conditions).group_by(key).order_by(key)
+    results = db.session.execute(statement).mappings().all()
+
+    range_days = (end - start).days + 1
+    room_count = 1 if room_id is not None else db.session.scalar(select(func.count(Room.id)))
+    room_names = dict(db.session.execute(select(Room.id, Room.name)).all()) if group_by == 'room' else {}
+
+    rows = []
+    for result in results:
+        if group_by == 'room':
+            row = {'room_id': result['key'], 'room_name': room_names.get(result['key'])}
+            room_nights = range_days
+        else:
+            period_start, period_end = _period_bounds(result['key'], group_by)
+            days = (min(period_end, end + timedelta(days=1)) - max(period_start, start)).days
+            row = {'period': result['key']}
+            room_nights = days * room_count
+        row.update(_summarize(result, room_nights))
+        rows.append(row)
+
+    totals = defaultdict(float)
+    for result in results:
+        for metric in METRICS:
+            totals[metric] += result[metric] or 0
+
+    return {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'group_by': group_by,
+        'room_id': room_id,
+        'rows': rows,
+        'totals': _summarize(totals, range_days * room_count)
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    from app import app
+
+    parser = argparse.ArgumentParser(description='Maintain booking report rollups')
+    parser.add_argument('command', choices=['backfill', 'check'])
+    parser.add_argument('--fix', action='store_true', help='backfill if the check finds differences')
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all(bind_key=None)
+        if args.command == 'backfill':
+            print(f"Rebuilt {backfill()} rollup rows")
+        else:
+            mismatches = check_rollups()
+            for mismatch in mismatches[:20]:
+                print(f"  room {mismatch['room_id']} {mismatch['day']} {mismatch['metric']}: "
+                      f"expected {mismatch['expected']}, stored {mismatch['stored']}")
+            if not mismatches:
+                print("Rollups match the bookings table")
+            elif args.fix:
+                print(f"{len(mismatches)} differences, rebuilt {backfill()} rollup rows")
+            else:
+                print(f"{len(mismatches)} differences (run with --fix to rebuild)")
+                sys.exit(1)
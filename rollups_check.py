@@ -0,0 +1,146 @@
+"""Check: booking rollups stay equal to the bookings table through ORM writes
+
+    python rollups_check.py [operations]
+
+Runs fixed sequences and then a random mix of ORM booking writes against a
+throwaway SQLite database: inserts, changes to bookings expired by an
+earlier commit (the session's default), changes flushed twice in one
+transaction, deletes, and rollbacks. After every commit ``check_rollups``
+must find no differences. Exits with status 1 on any difference.
+"""
+import os
+import random
+import sys
+import tempfile
+from datetime import date, timedelta
+
+DATABASE = os.path.join(tempfile.mkdtemp(), 'rollups.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DATABASE}'
+os.environ.pop('DATABASE_REPLICA_URL', None)
+
+from sqlalchemy import select
+
+from app import app, db
+from models import Booking, Room
+from rollups import check_rollups
+from tenancy import ensure_default_property, property_scope
+
+
+def new_booking(room_id, check_in, nights=1, price=100):
+    return Booking(room_id=room_id, guest_name='Ann Lee', guest_email='ann@example.com',
+                   check_in=check_in, check_out=check_in + timedelta(days=nights),
+                   num_guests=1, total_price=price)
+
+
+def verify(label):
+    mismatches = check_rollups()
+    for mismatch in mismatches[:5]:
+        print(f"  {label}: room {mismatch['room_id']} {mismatch['day']} {mismatch['metric']}: "
+              f"expected {mismatch['expected']}, stored {mismatch['stored']}")
+    return len(mismatches)
+
+
+def sequences(room_ids):
+    """The fixed sequences; returns the number of differences"""
+    failures = 0
+    day = date.today() + timedelta(days=30)
+
+    # Cancel a booking expired by the commit that created it
+    booking = new_booking(room_ids[0], day)
+    db.session.add(booking)
+    db.session.commit()
+    booking.status = 'cancelled'
+    db.session.commit()
+    failures += verify('cancel after commit')
+
+    # Move dates and room of an expired booking
+    booking.status = 'confirmed'
+    db.session.commit()
+    booking.check_in, booking.check_out = day + timedelta(days=3), day + timedelta(days=6)
+    booking.room_id = room_ids[1]
+    db.session.commit()
+    failures += verify('move after commit')
+
+    # Two flushes in one transaction
+    booking.total_price = 450
+    db.session.flush()
+    booking.status = 'pending'
+    db.session.commit()
+    failures += verify('two flushes')
+
+    # Change, then roll back
+    booking.status = 'cancelled'
+    db.session.flush()
+    db.session.rollback()
+    failures += verify('rollback')
+
+    # Delete an expired booking
+    db.session.delete(booking)
+    db.session.commit()
+    failures += verify('delete after commit')
+
+    # Load in a fresh session, then change
+    db.session.add(new_booking(room_ids[0], day, nights=2))
+    db.session.commit()
+    db.session.remove()
+    booking = db.session.scalars(select(Booking)).first()
+    booking.status = 'cancelled'
+    db.session.commit()
+    failures += verify('fresh session')
+    return failures
+
+
+def operate(rng, room_ids):
+    bookings = db.session.scalars(select(Booking)).all()
+    action = rng.choice(['add', 'add', 'status', 'dates', 'price', 'room', 'delete', 'rollback'])
+    if action == 'add' or not bookings:
+        check_in = date.today() + timedelta(days=rng.randint(-10, 60))
+        db.session.add(new_booking(rng.choice(room_ids), check_in, rng.randint(1, 5), rng.randint(100, 900)))
+    else:
+        booking = rng.choice(bookings)
+        if rng.random() < 0.5:
+            db.session.expire(booking)
+        if action == 'status':
+            booking.status = rng.choice(['pending', 'confirmed', 'cancelled', 'completed'])
+        elif action == 'dates':
+            booking.check_in = date.today() + timedelta(days=rng.randint(-10, 60))
+            booking.check_out = booking.check_in + timedelta(days=rng.randint(1, 5))
+        elif action == 'price':
+            booking.total_price = rng.randint(100, 900)
+        elif action == 'room':
+            booking.room_id = rng.choice(room_ids)
+        elif action == 'delete':
+            db.session.delete(booking)
+        else:
+            booking.status = 'cancelled'
+            db.session.flush()
+            db.session.rollback()
+            return
+    db.session.commit()
+
+
+def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    rng = random.Random(3)
+
+    with app.app_context():
+        db.create_all(bind_key=None)
+        property_id = ensure_default_property()
+        with property_scope(property_id):
+            for name in ('Garden Room', 'Lake Room', 'Family Villa'):
+                db.session.add(Room(name=name, room_type='Double', description='Check room',
+                                    image_url='https://example.com/room.jpg', price_per_night=100, max_guests=2))
+            db.session.commit()
+            room_ids = db.session.scalars(select(Room.id)).all()
+
+            failures = sequences(room_ids)
+            for step in range(operations):
+                operate(rng, room_ids)
+                failures += verify(f'step {step}')
+            count = len(db.session.scalars(select(Booking.id)).all())
+        print(f"{operations} random operations, {count} bookings, {failures} differences")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,350 @@
+"""Admin full-text search over contact messages and bookings
+
+PostgreSQL keeps a generated ``search_vector`` tsvector column with a GIN
+index on each searched table. SQLite keeps an FTS5 table per searched table,
+maintained by triggers. Either way the index is updated in the same statement
+as the insert/update/delete, so new messages are searchable immediately.
+Searches only return rows of the selected property (see tenancy.py).
+"""
+import re
+
+from markupsafe import escape
+from sqlalchemy import bindparam, event, text
+
+from models import db, Booking, Contact
+from tenancy import current_property_id
+
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+HEADLINE_OPTIONS = f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxWords=30, MinWords=10'
+
+# Searched tables: who (name/email), phone and free text columns
+SEARCH_TABLES = {
+    'contacts': {
+        'type': 'contact',
+        'model': Contact,
+        'name': 'name',
+        'email': 'email',
+        'phone': 'phone',
+        'text': ['subject', 'message'],
+    },
+    'bookings': {
+        'type': 'booking',
+        'model': Booking,
+        'name': 'guest_name',
+        'email': 'guest_email',
+        'phone': 'guest_phone',
+        'text': ['special_requests'],
+    },
+}
+
+SEARCH_TYPES = {spec['type']: table for table, spec in SEARCH_TABLES.items()}
+
+# Broad searches rank the newest matches of each table and count hits up to this
+MAX_RANKED = 1000
+
+# Words shown around the first match in SQLite snippets
+SNIPPET_WORDS = 24
+
+
+def _concat(columns, row=''):
+    """SQL expression joining nullable columns with spaces"""
+    return " || ' ' || ".join(f"coalesce({row}{column}, '')" for column in columns)
+
+
+def _digits(column, row=''):
+    """SQL expression stripping common phone punctuation so 0912345678 matches 0912-345-678"""
+    expression = f"coalesce({row}{column}, '')"
+    for char in ('-', ' ', '+', '(', ')', '.'):
+        expression = f"replace({expression}, '{char}', '')"
+    return expression
+
+
+# PostgreSQL
+
+def _pg_vector(spec):
+    who = (f"{_concat([spec['name'], spec['email']])} || ' ' || "
+           f"translate(coalesce({spec['email']}, ''), '@.', '  ')")
+    phone = f"coalesce({spec['phone']}, '') || ' ' || regexp_replace(coalesce({spec['phone']}, ''), '\\D', '', 'g')"
+    return (f"setweight(to_tsvector('simple', {who}), 'A') || "
+            f"setweight(to_tsvector('simple', {phone}), 'A') || "
+            f"setweight(to_tsvector('simple', {_concat(spec['text'])}), 'B')")
+
+
+def _install_postgresql(connection, table):
+    spec = SEARCH_TABLES[table]
+    connection.execute(text(
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({_pg_vector(spec)}) STORED"
+    ))
+    connection.execute(text(
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)"
+    ))
+
+
+# SQLite
+
+def _fts_columns(spec, row=''):
+    """SQL expressions for the who, phone and body columns of the FTS5 table"""
+    return [
+        _concat([spec['name'], spec['email']], row),
+        f"coalesce({row}{spec['phone']}, '') || ' ' || {_digits(spec['phone'], row)}",
+        _concat(spec['text'], row),
+    ]
+
+
+def _fts_values(spec, row=''):
+    return ', '.join(_fts_columns(spec, row))
+
+
+def _install_sqlite(connection, table):
+    spec = SEARCH_TABLES[table]
+    fts = f'{table}_fts'
+    existing = connection.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': fts}
+    ).scalar()
+    if existing and 'prefix=' not in existing:
+        # Created before the prefix indexes; recreate and refill it below
+        connection.execute(text(f"DROP TABLE {fts}"))
+        existing = None
+
+    # Prefix indexes keep short prefix queries ("g"*) from merging every matching term
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(who, phone, body, tokenize='unicode61', prefix='1 2 3')"
+    ))
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, who, phone, body) VALUES (new.id, {_fts_values(spec, 'new.')}); END"
+    ))
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN "
+        f"DELETE FROM {fts} WHERE rowid = old.id; END"
+    ))
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE ON {table} BEGIN "
+        f"DELETE FROM {fts} WHERE rowid = old.id; "
+        f"INSERT INTO {fts}(rowid, who, phone, body) VALUES (new.id, {_fts_values(spec, 'new.')}); END"
+    ))
+
+    if not existing:
+        _rebuild_sqlite(connection, table)
+
+
+def _rebuild_sqlite(connection, table):
+    spec = SEARCH_TABLES[table]
+    fts = f'{table}_fts'
+    connection.execute(text(f"DELETE FROM {fts}"))
+    connection.execute(text(
+        f"INSERT INTO {fts}(rowid, who, phone, body) SELECT id, {_fts_values(spec)} FROM {table}"
+    ))
+
+
+def _install(connection, table):
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        _install_postgresql(connection, table)
+    elif dialect == 'sqlite':
+        _install_sqlite(connection, table)
+
+
+def create_search_index(rebuild=False):
+    """Create (or rebuild) the search index for existing tables"""
+    with db.engine.begin() as connection:
+        for table in SEARCH_TABLES:
+            _install(connection, table)
+            if rebuild and connection.dialect.name == 'sqlite':
+                _rebuild_sqlite(connection, table)
+
+
+def _install_on_create(target, connection, **kw):
+    """Index tables as they are created by db.create_all()"""
+    _install(connection, target.name)
+
+
+for _spec in SEARCH_TABLES.values():
+    event.listen(_spec['model'].__table__, 'after_create', _install_on_create)
+
+
+# Querying
+
+def build_match_words(query):
+    """Split free text into words, each a list of lowercase terms ("ann@example.com" has three)"""
+    return [terms for terms in (re.findall(r'\w+', word) for word in query.lower().split()) if terms]
+
+
+def _property_filter(dialect, table, scoped):
+    """Extra FROM and WHERE SQL restricting hits to the selected property
+
+    Raw SQL bypasses the ORM scoping hook, so the property is filtered here.
+    On SQLite the base table is joined with CROSS JOIN, which keeps the FTS5
+    match as the outer loop. Otherwise (and with ``rowid IN (SELECT ...)``)
+    SQLite walks the property's rows and does one FTS5 lookup per row.
+    """
+    if not scoped:
+        return '', ''
+    if dialect == 'postgresql':
+        return '', ' AND property_id = :property_id'
+    return f' CROSS JOIN {table} t ON t.id = {table}_fts.rowid', ' AND t.property_id = :property_id'
+
+
+def _ranking_sql(dialect, tables, scoped=False):
+    """Phase 1: ids and scores of each table's best hits, with its (capped) match count
+
+    Each table ranks only its newest ``:candidates`` matches, counts them and
+    passes on its best ``:window`` (offset + limit), so a broad search costs
+    the same as a narrow one instead of scoring and sorting every match.
+    """
+    filters = {table: _property_filter(dialect, table, scoped) for table in tables}
+    if dialect == 'postgresql':
+        arms = [
+            f"SELECT '{SEARCH_TABLES[table]['type']}' AS type, id, "
+            f"ts_rank_cd(search_vector, to_tsquery('simple', :match)) AS score "
+            f"FROM (SELECT id, search_vector FROM {table} "
+            f"WHERE search_vector @@ to_tsquery('simple', :match){filters[table][1]} "
+            f"ORDER BY id DESC LIMIT :candidates) AS candidates"
+            for table in tables
+        ]
+    else:
+        # bm25() is lower-is-better; column weights favour who/phone over body
+        arms = [
+            f"SELECT '{SEARCH_TABLES[table]['type']}' AS type, {table}_fts.rowid AS id, "
+            f"-bm25({table}_fts, 4.0, 4.0, 1.0) AS score "
+            f"FROM {table}_fts{filters[table][0]} WHERE {table}_fts MATCH :match{filters[table][1]} "
+            f"ORDER BY {table}_fts.rowid DESC LIMIT :candidates"
+            for table in tables
+        ]
+
+    best = [
+        f"SELECT * FROM (SELECT *, count(*) OVER () AS matched FROM ({arm}) AS arm "
+        f"ORDER BY score DESC, id DESC LIMIT :window) AS best"
+        for arm in arms
+    ]
+    return text(' UNION ALL '.join(best))
+
+
+def _details_sql(dialect, table):
+    """Phase 2: display columns and highlighted snippet (SQLite: snippet text) for one page of ids"""
+    spec = SEARCH_TABLES[table]
+
+    if dialect == 'postgresql':
+        document = _concat([spec['name'], spec['email'], spec['phone']] + spec['text'])
+        sql = (
+            f"SELECT id, {spec['name']} AS title, {spec['email']} AS email, status, created_at, "
+            f"ts_headline('simple', {document}, to_tsquery('simple', :match), :options) AS snippet "
+            f"FROM {table} WHERE id IN :ids"
+        )
+    else:
+        # FTS5's snippet() would need a second MATCH, which re-reads the whole
+        # doclist of a prefix term for every row; _snippet() works on these columns
+        columns = ', '.join(f'{expression} AS {name}' for name, expression in
+                            zip(('who', 'phone', 'body'), _fts_columns(spec, 't.')))
+        sql = (
+            f"SELECT t.id, t.{spec['name']} AS title, t.{spec['email']} AS email, t.status, t.created_at, "
+            f"{columns} FROM {table} t WHERE t.id IN :ids"
+        )
+    # Typed like the ORM column, so SQLite's stored text comes back as a datetime too
+    return text(sql).bindparams(bindparam('ids', expanding=True)).columns(created_at=spec['model'].created_at.type)
+
+
+def _snippet(columns, words):
+    """Up to ``SNIPPET_WORDS`` words around the first match in the column with most matches
+
+    Marks matches like FTS5's snippet(): the last term as a prefix, the others exactly.
+    """
+    terms = [term for word in words for term in word]
+    exact, prefix = set(terms[:-1]), terms[-1]
+
+    value, tokens, marked = '', [], []
+    for column in columns:
+        column_tokens = list(re.finditer(r'\w+', column or ''))
+        column_marked = [i for i, token in enumerate(column_tokens)
+                         if token.group().lower() in exact or token.group().lower().startswith(prefix)]
+        if not tokens or len(column_marked) > len(marked):
+            value, tokens, marked = column or '', column_tokens, column_marked
+    if not tokens:
+        return ''
+
+    start = max(0, min((marked[0] if marked else 0) - 2, len(tokens) - SNIPPET_WORDS))
+    stop = min(len(tokens), start + SNIPPET_WORDS)
+    marked = set(marked)
+    parts = ['…'] if start else []
+    position = tokens[start].start()
+    for i in range(start, stop):
+        token = tokens[i]
+        parts.append(value[position:token.start()])
+        parts.append(f'{HIGHLIGHT_START}{token.group()}{HIGHLIGHT_STOP}' if i in marked else token.group())
+        position = token.end()
+    if stop < len(tokens):
+        parts.append('…')
+    return ''.join(parts)
+
+
+def _highlight(snippet):
+    """HTML-escape a snippet and turn the highlight markers into <mark> tags"""
+    html = str(escape(snippet or ''))
+    return html.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_STOP, '</mark>')
+
+
+def search_records(query, types=None, page=1, per_page=20):
+    """Ranked, paginated search across contacts and bookings
+
+    ``total`` stops at ``MAX_RANKED``; ``total_capped`` says there are more.
+    """
+    tables = [SEARCH_TYPES[t] for t in (types or SEARCH_TYPES) if t in SEARCH_TYPES]
+    words = build_match_words(query)
+    if not words or not tables:
+        return {'results': [], 'total': 0, 'total_capped': False, 'page': page, 'per_page': per_page}
+
+    dialect = db.session.get_bind().dialect.name
+    # One phrase per word, so an email's terms must be adjacent, and only the
+    # last word is a prefix: FTS5 reads the whole doclist of every prefix term
+    if dialect == 'postgresql':
+        phrases = [' <-> '.join(terms) for terms in words]
+        match = ' & '.join(f'({phrase})' for phrase in phrases[:-1] + [phrases[-1] + ':*'])
+    else:
+        match = ' '.join(f'"{" ".join(terms)}"' for terms in words) + '*'
+
+    property_id = current_property_id()
+    scope = {} if property_id is None else {'property_id': property_id}
+    offset = (page - 1) * per_page
+    best = db.session.execute(_ranking_sql(dialect, tables, scoped=property_id is not None), {
+        'match': match,
+        'window': offset + per_page,
+        'candidates': max(MAX_RANKED + 1, offset + per_page),
+        **scope
+    }).all()
+    counted = sum({hit.type: hit.matched for hit in best}.values())
+    total = min(counted, MAX_RANKED)
+    hits = sorted(best, key=lambda hit: (hit.score, hit.id), reverse=True)[offset:offset + per_page]
+
+    # Load display columns and snippets only for the page of hits
+    details = {}
+    for table in tables:
+        ids = [hit.id for hit in hits if hit.type == SEARCH_TABLES[table]['type']]
+        if not ids:
+            continue
+        rows = db.session.execute(_details_sql(dialect, table), {
+            'match': match,
+            'ids': ids,
+            'options': HEADLINE_OPTIONS
+        })
+        for row in rows:
+            details[(SEARCH_TABLES[table]['type'], row.id)] = row
+
+    results = []
+    for hit in hits:
+        row = details.get((hit.type, hit.id))
+        if row is None:
+            continue
+        results.append({
+            'type': hit.type,
+            'id': hit.id,
+            'title': row.title,
+            'email': row.email,
+            'status': row.status,
+            'created_at': row.created_at.isoformat() if row.created_at else None,
+            'rank': float(hit.score),
+            'snippet': _highlight(row.snippet if dialect == 'postgresql' else _snippet([row.who, row.phone, row.body], words))
+        })
+
+    return {'results': results, 'total': total, 'total_capped': counted > MAX_RANKED, 'page': page, 'per_page': per_page}
@@ -0,0 +1,156 @@
+"""Shared serializers for JSON API responses
+
+Each schema lists its output fields once, mapped to model columns. List
+endpoints select only those columns (no ORM object hydration) and turn the
+rows into plain dicts, which are encoded with orjson when it is installed
+and the standard library ``json`` module otherwise.
+"""
+import json
+
+from flask import Response
+from sqlalchemy import select
+
+from models import Booking, Contact, Room
+
+try:
+    import orjson
+except ImportError:  # Optional dependency
+    orjson = None
+
+
+def dumps(data):
+    """Encode data as JSON bytes using the fastest available backend"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def json_response(data, status=200):
+    """Build a JSON response without going through jsonify"""
+    return Response(dumps(data), status=status, mimetype='application/json')
+
+
+def _split_list(value):
+    return value.split(',') if value else []
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+class Field:
+    """One output field read from a model column"""
+
+    def __init__(self, column, transform=None):
+        self.column = column
+        self.transform = transform
+
+
+class Schema:
+    """Column-based serializer for one model
+
+    Subclasses set ``model``, ``fields`` (output name -> Field) and
+    optionally ``default_fields`` when some fields are opt-in only.
+    """
+    model = None
+    fields = {}
+    default_fields = None
+
+    def __init__(self, only=None):
+        if only:
+            unknown = [name for name in only if name not in self.fields]
+            if unknown:
+                raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+            names = list(dict.fromkeys(only))
+        else:
+            names = list(self.default_fields or self.fields)
+
+        self.names = names
+        self._columns = [getattr(self.model, self.fields[name].column) for name in names]
+        self._transforms = [self.fields[name].transform for name in names]
+        self._plain = not any(self._transforms)
+
+    @classmethod
+    def from_request(cls, args):
+        """Build a schema honouring ``?fields=a,b,c``"""
+        fields = args.get('fields')
+        return cls(only=[name.strip() for name in fields.split(',') if name.strip()] if fields else None)
+
+    def select(self):
+        """SELECT of just the columns this schema needs"""
+        return select(*self._columns)
+
+    def dump_row(self, row):
+        """Serialize one row (tuple in ``names`` order) to a dict"""
+        if self._plain:
+            return dict(zip(self.names, row))
+        return {
+            name: transform(value) if transform else value
+            for name, value, transform in zip(self.names, row, self._transforms)
+        }
+
+    def dump_rows(self, rows):
+        """Serialize rows returned by ``select()``"""
+        return [self.dump_row(row) for row in rows]
+
+    def dump(self, obj):
+        """Serialize a loaded model instance"""
+        return self.dump_row([getattr(obj, self.fields[name].column) for name in self.names])
+
+    def pick(self, data):
+        """Apply field selection to already-built dicts"""
+        return [{name: item.get(name) for name in self.names} for item in data]
+
+
+class RoomSchema(Schema):
+    """Public room data as served by /api/rooms"""
+    model = Room
+    fields = {
+        'id': Field('id'),
+        'name': Field('name'),
+        'type': Field('room_type'),
+        'description': Field('description'),
+        'amenities': Field('amenities', _split_list),
+        'price_per_night': Field('price_per_night'),
+        'image': Field('image_url'),
+        'max_guests': Field('max_guests'),
+        'is_featured': Field('is_featured'),
+        'is_available': Field('is_available'),
+    }
+    default_fields = ('id', 'name', 'type', 'description', 'amenities', 'price_per_night', 'image')
+
+
+class BookingSchema(Schema):
+    """Booking data for admin and integration endpoints"""
+    model = Booking
+    fields = {
+        'id': Field('id'),
+        'room_id': Field('room_id'),
+        'user_id': Field('user_id'),
+        'guest_name': Field('guest_name'),
+        'guest_email': Field('guest_email'),
+        'guest_phone': Field('guest_phone'),
+        'check_in': Field('check_in', _isoformat),
+        'check_out': Field('check_out', _isoformat),
+        'num_guests': Field('num_guests'),
+        'total_price': Field('total_price'),
+        'status': Field('status'),
+        'special_requests': Field('special_requests'),
+        'created_at': Field('created_at', _isoformat),
+        'updated_at': Field('updated_at', _isoformat),
+    }
+
+
+class ContactSchema(Schema):
+    """Contact message data for admin endpoints"""
+    model = Contact
+    fields = {
+        'id': Field('id'),
+        'name': Field('name'),
+        'email': Field('email'),
+        'phone': Field('phone'),
+        'subject': Field('subject'),
+        'message': Field('message'),
+        'status': Field('status'),
+        'created_at': Field('created_at', _isoformat),
+    }
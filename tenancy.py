@@ -0,0 +1,342 @@
+"""Multi-property support: selecting a property and scoping queries to it
+
+Rooms, bookings, contact messages and report rollups belong to a property
+(``PropertyScoped`` in models.py). Every request selects one property, from
+``?property=<slug>`` (remembered in the session), the property whose
+``domain`` matches the request's host name, or else the first property.
+While it is selected, a session hook adds ``property_id = <selected>`` to
+every ORM SELECT, UPDATE and DELETE on a scoped model, and new scoped rows are
+stamped with it on flush, so routes, batch operations and reports need no
+property filters of their own. Raw SQL (search.py) filters on
+``current_property_id()`` itself.
+
+Scripts run with no property selected and see every property;
+``property_scope(property_id)`` selects one explicitly. A statement can opt
+out with ``execution_options(all_properties=True)``.
+
+On PostgreSQL, ``bookings`` can be list-partitioned by property
+(``PARTITION_BOOKINGS=True`` at /init-db, or ``python tenancy.py partition``).
+Each property then gets its own partition, created along with the property.
+
+    python tenancy.py upgrade                    # add property columns to an existing database
+    python tenancy.py partition                  # PostgreSQL: partition bookings by property
+    python tenancy.py create <slug> <name> [--domain example.com]
+"""
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import current_app, g, request, session
+from sqlalchemy import inspect, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import with_loader_criteria
+
+from models import db, Booking, Property, PropertyScoped
+
+DEFAULT_PROPERTY_SLUG = 'default'
+
+SLUG_PATTERN = re.compile(r'[a-z0-9][a-z0-9-]{0,49}\Z')
+
+_current_property = ContextVar('current_property', default=None)
+
+
+def current_property_id():
+    """Id of the selected property, or None when no property is selected"""
+    return _current_property.get()
+
+
+@contextmanager
+def property_scope(property_id):
+    """Select a property for the duration of a block (scripts, the ASGI API)"""
+    token = _current_property.set(property_id)
+    try:
+        yield
+    finally:
+        _current_property.reset(token)
+
+
+# Central query scoping
+
+def _scope_to_property(execute_state):
+    """Restrict ORM statements on property-scoped models to the selected property"""
+    property_id = _current_property.get()
+    if property_id is None or execute_state.is_column_load:
+        return
+    if not (execute_state.is_select or execute_state.is_update or execute_state.is_delete):
+        return
+    if execute_state.execution_options.get('all_properties'):
+        return
+    execute_state.statement = execute_state.statement.options(with_loader_criteria(
+        PropertyScoped, lambda cls: cls.property_id == property_id, include_aliases=True
+    ))
+
+
+def _stamp_new_rows(session, flush_context, instances):
+    """Give new property-scoped rows the selected (or only) property"""
+    property_id = None
+    for obj in session.new:
+        if not isinstance(obj, PropertyScoped) or obj.property_id is not None:
+            continue
+        if property_id is None:
+            property_id = _current_property.get() or session.scalar(
+                select(Property.id).order_by(Property.id).limit(1)
+            )
+            if property_id is None:
+                raise RuntimeError('No property exists yet; run /init-db or python tenancy.py upgrade')
+        obj.property_id = property_id
+
+
+# Registered by create_app() (see db_routing.init_session_hooks)
+SCOPING_HOOKS = [
+    ('do_orm_execute', _scope_to_property),
+    ('before_flush', _stamp_new_rows),
+]
+
+
+# Property lookup
+
+class PropertyDirectory:
+    """Cached properties by slug and domain, reloaded at most once per interval"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._properties = []
+        self._by_slug = {}
+        self._by_domain = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def is_fresh(self):
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.interval
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def load(self):
+        """Reload from the database if the cache is stale (needs an app context)"""
+        if self.is_fresh():
+            return
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            if self.is_fresh():
+                return
+            properties = _read_properties()
+            if not properties:
+                ensure_default_property()
+                properties = _read_properties()
+            self._properties = properties
+            self._by_slug = {prop['slug']: prop for prop in properties}
+            self._by_domain = {prop['domain'].lower(): prop for prop in properties if prop['domain']}
+            self._loaded_at = time.monotonic()
+
+    def all(self):
+        return self._properties
+
+    def by_slug(self, slug):
+        return self._by_slug.get(slug) if slug else None
+
+    def choose(self, slug=None, host=None):
+        """Property for a request: explicit slug, then host name, then the first property"""
+        prop = self.by_slug(slug)
+        if prop is None and host:
+            prop = self._by_domain.get(host.split(':')[0].lower())
+        if prop is None and self._properties:
+            prop = self._properties[0]
+        return prop
+
+
+def _read_properties():
+    rows = db.session.execute(
+        select(Property.id, Property.slug, Property.name, Property.domain).order_by(Property.id)
+    ).mappings()
+    return [dict(row) for row in rows]
+
+
+def ensure_default_property():
+    """Create the first property if there is none; returns the first property's id"""
+    property_id = db.session.scalar(select(Property.id).order_by(Property.id).limit(1))
+    if property_id is not None:
+        return property_id
+    try:
+        prop = Property(slug=DEFAULT_PROPERTY_SLUG, name=os.getenv('PROPERTY_NAME', 'Gancheng B&B'))
+        db.session.add(prop)
+        db.session.commit()
+        return prop.id
+    except IntegrityError:
+        # Another worker created it first
+        db.session.rollback()
+        return db.session.scalar(select(Property.id).order_by(Property.id).limit(1))
+
+
+def init_tenancy(app):
+    """Select a property for every request and expose it to templates"""
+    app.extensions['tenancy'] = PropertyDirectory(app.config.get('PROPERTY_CACHE_SECONDS', 30))
+
+    @app.before_request
+    def select_property():
+        directory = app.extensions['tenancy']
+        directory.load()
+        slug = request.args.get('property')
+        if directory.by_slug(slug) is not None and session.get('property') != slug:
+            session['property'] = slug
+        prop = directory.choose(slug=slug or session.get('property'), host=request.host)
+        g.current_property = prop
+        g.property_token = _current_property.set(prop['id'] if prop else None)
+
+    @app.teardown_request
+    def release_property(exc):
+        token = g.pop('property_token', None)
+        if token is not None:
+            _current_property.reset(token)
+
+    @app.context_processor
+    def inject_properties():
+        return {
+            'current_property': g.get('current_property'),
+            'properties': app.extensions['tenancy'].all()
+        }
+
+
+def create_property(slug, name, domain=None):
+    """Add a property, with its own bookings partition when bookings are partitioned"""
+    if not isinstance(slug, str) or not SLUG_PATTERN.match(slug):
+        raise ValueError('slug must be lowercase letters, digits and dashes')
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError('name is required')
+
+    prop = Property(slug=slug, name=name.strip(), domain=(domain or '').strip().lower() or None)
+    db.session.add(prop)
+    db.session.flush()
+    connection = db.session.connection()
+    if bookings_partitioned(connection):
+        _create_partition(connection, prop.id)
+    db.session.commit()
+
+    current_app.extensions['tenancy'].invalidate()
+    return prop
+
+
+# Schema upgrade and partitioning
+
+def upgrade_schema():
+    """Create tables and add property columns/indexes to tables that predate them"""
+    db.create_all(bind_key=None)
+    default_id = ensure_default_property()
+
+    with db.engine.begin() as connection:
+        inspector = inspect(connection)
+        for model in PropertyScoped.__subclasses__():
+            table = model.__table__
+            columns = {column['name'] for column in inspector.get_columns(table.name)}
+            if 'property_id' not in columns:
+                # Everything stored so far belongs to the first property
+                connection.execute(text(
+                    f"ALTER TABLE {table.name} ADD COLUMN property_id INTEGER REFERENCES properties (id)"
+                ))
+                connection.execute(text(f"UPDATE {table.name} SET property_id = :id"), {'id': default_id})
+                if connection.dialect.name == 'postgresql':
+                    connection.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN property_id SET NOT NULL"))
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
+
+def bookings_partitioned(connection):
+    if connection.dialect.name != 'postgresql':
+        return False
+    return connection.scalar(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('bookings')"
+    )) is not None
+
+
+def _create_partition(connection, property_id):
+    property_id = int(property_id)
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS bookings_p{property_id} PARTITION OF bookings FOR VALUES IN ({property_id})"
+    ))
+
+
+def partition_bookings():
+    """Rebuild bookings as a table list-partitioned by property (PostgreSQL only)
+
+    Returns True if the table was converted. Runs in one transaction and
+    holds an exclusive lock on bookings while the rows are copied.
+    """
+    from search import create_search_index
+
+    table = Booking.__table__
+    columns = ', '.join(column.name for column in table.columns)
+
+    with db.engine.begin() as connection:
+        if connection.dialect.name != 'postgresql' or bookings_partitioned(connection):
+            return False
+
+        connection.execute(text("LOCK TABLE bookings IN ACCESS EXCLUSIVE MODE"))
+        sequence = connection.scalar(text("SELECT pg_get_serial_sequence('bookings', 'id')"))
+        connection.execute(text("ALTER TABLE bookings RENAME TO bookings_unpartitioned"))
+
+        # Same columns, defaults (id sequence) and generated search_vector
+        connection.execute(text(
+            "CREATE TABLE bookings (LIKE bookings_unpartitioned INCLUDING DEFAULTS INCLUDING GENERATED) "
+            "PARTITION BY LIST (property_id)"
+        ))
+        # The partition key has to be part of the primary key
+        connection.execute(text("ALTER TABLE bookings ADD PRIMARY KEY (id, property_id)"))
+        for foreign_key in table.foreign_keys:
+            connection.execute(text(
+                f"ALTER TABLE bookings ADD FOREIGN KEY ({foreign_key.parent.name}) "
+                f"REFERENCES {foreign_key.column.table.name} ({foreign_key.column.name})"
+            ))
+
+        for property_id in connection.scalars(select(Property.id)):
+            _create_partition(connection, property_id)
+        connection.execute(text("CREATE TABLE IF NOT EXISTS bookings_default PARTITION OF bookings DEFAULT"))
+
+        connection.execute(text(f"INSERT INTO bookings ({columns}) SELECT {columns} FROM bookings_unpartitioned"))
+
+        # Keep the id sequence when the old table goes
+        if sequence:
+            connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+        connection.execute(text("DROP TABLE bookings_unpartitioned"))
+        if sequence:
+            connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY bookings.id"))
+
+        for index in table.indexes:
+            index.create(connection)
+
+    # The search index went with the old table
+    create_search_index()
+    return True
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    from app import app
+
+    parser = argparse.ArgumentParser(description='Manage properties')
+    parser.add_argument('command', choices=['upgrade', 'partition', 'create'])
+    parser.add_argument('slug', nargs='?')
+    parser.add_argument('name', nargs='?')
+    parser.add_argument('--domain')
+    args = parser.parse_args()
+
+    with app.app_context():
+        upgrade_schema()
+        if args.command == 'upgrade':
+            print("Schema is up to date")
+        elif args.command == 'partition':
+            if partition_bookings():
+                print("bookings is now partitioned by property")
+            else:
+                print("Nothing to do (not PostgreSQL, or already partitioned)")
+        else:
+            try:
+                prop = create_property(args.slug, args.name, args.domain)
+            except (ValueError, IntegrityError) as e:
+                print(f"Creating property failed: {e}")
+                sys.exit(1)
+            print(f"Created property {prop.slug} (id {prop.id})")
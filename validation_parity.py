@@ -0,0 +1,220 @@
+"""Parity check: compiled validators vs the WTForms classes in forms.py
+
+    python validation_parity.py [random_cases]
+
+Builds payloads from valid contact/booking requests with one or several
+fields replaced by edge-case values (missing, null, blanks, boundary lengths,
+odd emails, numbers as strings, lists, past and unordered dates, ...), runs
+each one through the form exactly as the Flask route does and through the
+compiled validator, and compares errors and cleaned data. Also fuzzes the
+email fast path against email_validator. Exits with status 1 on any mismatch.
+
+Payloads the forms crash on (e.g. ``{"name": 5}``) or accept with unusable
+data (e.g. ``{"phone": {}}``) only need to come out as clean types or field
+errors from the compiled validator.
+"""
+import json
+import random
+import string
+import sys
+from datetime import date, timedelta
+
+import email_validator
+from flask import request
+from wtforms import DateField, IntegerField
+
+from app import app
+from forms import BookingForm, ContactForm
+from validation import booking_validator, contact_validator, is_valid_email
+
+MISSING = object()
+TODAY = date.today()
+
+STRINGS = [MISSING, None, '', ' ', '   ', 'a', 'ab', ' a ', 'Ann', 'x' * 7, 'x' * 8, 'x' * 9, 'x' * 19,
+           'x' * 20, 'x' * 21, 'x' * 99, 'x' * 100, 'x' * 101, 'x' * 199, 'x' * 200, 'x' * 201,
+           'x' * 499, 'x' * 500, 'x' * 501, 'x' * 1999, 'x' * 2000, 'x' * 2001, '陳大文', 'é' * 10,
+           '<b>hi</b>', 'line\nbreak', '\t\n', [], ['Ann Lee'], ['Ann', 'Bo'], [''], 5, 0, 1.5, True,
+           False, {}, {'a': 1, 'b': 2}, [5]]
+
+EMAILS = STRINGS + [
+    'ann@example.com', 'ANN@EXAMPLE.COM', 'ann.lee+tag@mail.example.co.uk', 'a@b.co', 'a@b.c',
+    'a@b', 'ann@', '@example.com', 'ann@@example.com', 'ann example@example.com', 'ann@example..com',
+    '.ann@example.com', 'ann.@example.com', 'an..n@example.com', 'ann@-example.com', 'ann@example-.com',
+    'ann@exa--mple.com', 'ann@xn--bcher-kva.ch', 'ann@bücher.ch', 'ännä@example.com', '"ann lee"@example.com',
+    'ann@localhost', 'ann@printer.local', 'ann@example.test', 'ann@example.invalid', 'ann@host.onion',
+    'ann@1.2.3.4', 'ann@[1.2.3.4]', 'ann@example.123', 'ann@example.c0m', "o'brien@example.ie",
+    'ann!#$%&*/=?^`{|}~@example.com', 'ann@example.com.', ' ann@example.com', 'ann@example.com ',
+    'a' * 64 + '@example.com', 'a' * 65 + '@example.com', 'a@' + 'b' * 63 + '.com', 'a@' + 'b' * 64 + '.com',
+    'a@' + '.'.join(['b' * 60] * 4) + '.com', 'ann@EXAMPLE.Com', 'ann_lee%x@sub-domain.example.org',
+    ['ann@example.com'], ['bad', 'ann@example.com'],
+]
+
+INTEGERS = [MISSING, None, 0, 1, 2, 3, 10, 11, -1, 2.5, 0.9, 1e3, True, False, '', ' ', '1', ' 2 ', '01',
+            '1.0', '1e2', 'abc', '1_0', '３', '-0', [], ['2'], ['x'], [2, 3], {}, 10 ** 30,
+            float('nan'), float('inf'), '10', '11']
+
+
+def day(offset):
+    return (TODAY + timedelta(days=offset)).isoformat()
+
+
+DATES = [MISSING, None, '', ' ', day(-1), day(0), day(1), day(3), day(30), day(-400), '2030-2-3', '2030-02-30',
+         '2030-13-01', '20300203', '2030/02/03', '2030-02-03T10:00:00', ' ' + day(3), day(3) + ' ', 'tomorrow',
+         [], [day(3)], [day(3), day(4)], [day(3), 5], 5, True, {}, '２０３０-01-01']
+
+CONTACT_BASE = {
+    'name': 'Ann Lee',
+    'email': 'ann@example.com',
+    'phone': '0912-345-678',
+    'subject': 'Room question',
+    'message': 'Do you have a family room for next weekend?',
+}
+CONTACT_VALUES = {
+    'name': STRINGS, 'email': EMAILS, 'phone': STRINGS, 'subject': STRINGS, 'message': STRINGS,
+}
+
+BOOKING_BASE = {
+    'room_id': 1,
+    'guest_name': 'Ann Lee',
+    'guest_email': 'ann@example.com',
+    'guest_phone': '0912345678',
+    'check_in': day(3),
+    'check_out': day(5),
+    'num_guests': 2,
+    'special_requests': 'Late arrival',
+}
+BOOKING_VALUES = {
+    'room_id': INTEGERS, 'guest_name': STRINGS, 'guest_email': EMAILS, 'guest_phone': STRINGS,
+    'check_in': DATES, 'check_out': DATES, 'num_guests': INTEGERS, 'special_requests': STRINGS,
+}
+
+
+def clean_types(form_class):
+    """Per field, the data types the routes can store"""
+    types = {}
+    for name in dir(form_class):
+        field_class = getattr(getattr(form_class, name), 'field_class', None)
+        if field_class is None:
+            continue
+        if issubclass(field_class, DateField):
+            types[name] = date
+        elif issubclass(field_class, IntegerField):
+            types[name] = int
+        else:
+            types[name] = str
+    return types
+
+
+def is_clean(data, types):
+    return all(value is None or type(value) is types[name] for name, value in data.items())
+
+
+def mutate(base, changes):
+    payload = dict(base)
+    for name, value in changes.items():
+        if value is MISSING:
+            payload.pop(name, None)
+        else:
+            payload[name] = value
+    return payload
+
+
+def cases(base, values, random_cases, rng):
+    """Single-field mutations, then random multi-field mutations"""
+    yield base
+    yield {}
+    for name, options in values.items():
+        for value in options:
+            yield mutate(base, {name: value})
+    names = list(values)
+    for _ in range(random_cases):
+        picked = rng.sample(names, rng.randint(2, len(names)))
+        yield mutate(base, {name: rng.choice(values[name]) for name in picked})
+
+
+def run_form(form_class, payload):
+    """Validate like the Flask route: JSON body, Form(data=request.get_json())"""
+    body = json.dumps(payload)
+    with app.test_request_context('/api/test', method='POST', data=body, content_type='application/json'):
+        form = form_class(data=request.get_json(), meta={'csrf': False})
+        valid = form.validate()
+        return valid, form.errors, form.data
+
+
+def check_form(label, form_class, validator, base, values, random_cases, rng):
+    totals = {'cases': 0, 'matched': 0, 'form_crashed': 0, 'form_unusable': 0, 'mismatches': 0}
+    types = clean_types(form_class)
+    for payload in cases(base, values, random_cases, rng):
+        totals['cases'] += 1
+        data, errors = validator.validate(json.loads(json.dumps(payload)))
+        clean = is_clean(data, types)
+
+        try:
+            valid, form_errors, form_data = run_form(form_class, payload)
+        except Exception:
+            totals['form_crashed'] += 1
+            if not errors or not clean:
+                totals['mismatches'] += 1
+                print(f"  {label}: form crashed, validator accepted {payload!r}")
+            continue
+
+        form_clean = is_clean(form_data, types)
+        if errors == form_errors and clean and (not valid or data == form_data or not form_clean):
+            totals['matched'] += 1
+            continue
+        if not form_clean and clean:
+            # Form kept a number/object/list where text was expected
+            totals['form_unusable'] += 1
+            continue
+
+        totals['mismatches'] += 1
+        print(f"  {label}: mismatch for {payload!r}\n    form:      {form_errors!r} {form_data!r}"
+              f"\n    compiled:  {errors!r} {data!r}")
+
+    print(f"{label:<8} {totals['cases']:>6} cases, {totals['matched']} identical, "
+          f"{totals['form_crashed']} form crashes, {totals['form_unusable']} unusable form data, "
+          f"{totals['mismatches']} mismatches")
+    return totals['mismatches']
+
+
+def email_by_library(address):
+    try:
+        email_validator.validate_email(address, check_deliverability=False, allow_smtputf8=True,
+                                       allow_empty_local=False)
+    except email_validator.EmailNotValidError:
+        return False
+    return True
+
+
+def fuzz_emails(count, rng):
+    """Random addresses built from the characters that matter for the fast path"""
+    local_chars = string.ascii_letters[:6] + string.digits[:3] + '._%+-!#"'
+    domain_chars = 'abcXYZ09-.'
+    tlds = ['com', 'co', 'c', 'C0', 'local', 'test', 'xn--p1ai', '', 'org.', 'a' * 64, 'io']
+    mismatches = 0
+    for _ in range(count):
+        local = ''.join(rng.choice(local_chars) for _ in range(rng.randint(0, 8)))
+        if rng.random() < 0.05:
+            local = 'a' * rng.randint(60, 70)
+        domain = ''.join(rng.choice(domain_chars) for _ in range(rng.randint(0, 10)))
+        address = f"{local}@{domain}.{rng.choice(tlds)}" if rng.random() < 0.9 else f"{local}@{domain}"
+        if is_valid_email(address) != email_by_library(address):
+            mismatches += 1
+            print(f"  email: mismatch for {address!r}")
+    print(f"{'email':<8} {count:>6} random addresses, {mismatches} mismatches")
+    return mismatches
+
+
+def main():
+    random_cases = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = random.Random(42)
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    mismatches = check_form('contact', ContactForm, contact_validator, CONTACT_BASE, CONTACT_VALUES, random_cases, rng)
+    mismatches += check_form('booking', BookingForm, booking_validator, BOOKING_BASE, BOOKING_VALUES, random_cases, rng)
+    mismatches += fuzz_emails(random_cases * 10, rng)
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Worker warm-up before accepting traffic
+
+A fresh worker (new deploy or gunicorn worker recycle) would otherwise pay
+for compiling Jinja templates, opening database connections and the first
+room queries on its first real requests. ``warm_up`` does that work up
+front. ``gunicorn.conf.py`` starts it from ``post_worker_init`` in a
+background thread: the worker accepts connections at once, ``/ready``
+answers 503 until warm-up has finished, and every other request waits for
+it (at most ``WARMUP_WAIT_SECONDS``), so no real request is served cold.
+"""
+import threading
+import time
+
+from flask import current_app, request
+
+from models import db
+
+# Marks the warm-up's own page requests, which must not wait for warm-up
+WARMUP_ENVIRON_KEY = 'gangcheng.warmup'
+
+
+def init_warmup(app):
+    """Register warm-up state for the readiness endpoint and hold requests while warming"""
+    app.extensions['warmup'] = {'ready': False, 'seconds': None, 'steps': {}}
+    # Set while no warm-up is running
+    done = threading.Event()
+    done.set()
+    app.extensions['warmup_done'] = done
+    app.before_request(_wait_for_warm_up)
+
+
+def _wait_for_warm_up():
+    if request.endpoint == 'main.ready' or request.environ.get(WARMUP_ENVIRON_KEY):
+        return
+    current_app.extensions['warmup_done'].wait(current_app.config.get('WARMUP_WAIT_SECONDS', 30))
+
+
+def _timed(steps, name, func):
+    start = time.perf_counter()
+    try:
+        func()
+    except Exception as e:
+        print(f"Warm-up step '{name}' failed: {e}")
+    steps[name] = round(time.perf_counter() - start, 4)
+
+
+def compile_templates(app):
+    """Load every template so Jinja compiles and caches it now"""
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+
+def open_pool_connections(app):
+    """Check out and return the minimum number of connections per engine"""
+    count = app.config.get('WARMUP_POOL_CONNECTIONS', 2)
+    with app.app_context():
+        for engine in db.engines.values():
+            connections = []
+            try:
+                for _ in range(count):
+                    connections.append(engine.connect())
+            finally:
+                for connection in connections:
+                    connection.close()
+
+
+def prime_pages(app):
+    """Request the room pages once so queries, templates and caches are hot"""
+    client = app.test_client()
+    for path in app.config.get('WARMUP_PATHS', []):
+        if path:
+            client.get(path, environ_base={WARMUP_ENVIRON_KEY: True})
+
+
+def warm_up(app):
+    """Run all warm-up steps and mark the worker ready"""
+    state = app.extensions['warmup']
+    start = time.perf_counter()
+
+    try:
+        _timed(state['steps'], 'templates', lambda: compile_templates(app))
+        _timed(state['steps'], 'pool', lambda: open_pool_connections(app))
+        _timed(state['steps'], 'pages', lambda: prime_pages(app))
+    finally:
+        state['seconds'] = round(time.perf_counter() - start, 4)
+        state['ready'] = True
+        app.extensions['warmup_done'].set()
+    return state
+
+
+def start_warm_up(app, done=None):
+    """Run warm_up in a background thread, then call `done` with its state
+
+    Requests other than /ready wait for it from now on.
+    """
+    app.extensions['warmup_done'].clear()
+
+    def run():
+        state = warm_up(app)
+        if done is not None:
+            done(state)
+
+    thread = threading.Thread(target=run, name='warm-up', daemon=True)
+    thread.start()
+    return thread